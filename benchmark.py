@@ -0,0 +1,548 @@
+import argparse
+import contextlib
+import csv
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from driver_setup import setup_driver, DRIVER_PROFILES
+from functions import get_google_reviews, GBP_TIERS, TIER_FULL
+from download_image import process_csv, process_gbp_images, IMAGE_COLUMNS
+from rate_limiter import SCHEDULER, host_key
+from metrics import METRICS, STAGE_LISTING_DETAIL, STAGE_GBP_LOOKUP, STAGE_DIRECTORY_PAGE, STAGE_GOOGLE_SEARCH
+from main import main as run_crawl, EXTRACTORS
+
+try:
+    import psutil
+except ImportError:
+    # Without psutil only the peak RSS the kernel reports per process is available
+    psutil = None
+
+# Size of the fixture directory
+DEFAULT_LISTINGS = 60
+DEFAULT_PAGE_SIZE = 20
+
+# Reviews in each fixture knowledge panel
+FIXTURE_REVIEWS = 8
+
+# States the fixture listings are spread over
+FIXTURE_STATES = ('CT', 'ME', 'NH')
+
+# Benchmarks selectable with --scenarios
+SCENARIOS = ('pipeline', 'gbp', 'images')
+
+# Result fields compared against a --baseline: name -> True if higher is better
+COMPARED_FIELDS = {
+    'listings_per_minute': True,
+    'gbp_lookups_per_minute': True,
+    'images_per_minute': True,
+    'p95_seconds': False,
+    'peak_rss_mb': False
+}
+
+# Relative change against the baseline reported as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Seconds between two RSS samples
+RSS_SAMPLE_INTERVAL = 0.25
+
+# Stand-in JPEG body served for every fixture image
+FIXTURE_IMAGE = b'\xff\xd8\xff\xe0' + bytes(range(256)) * 16 + b'\xff\xd9'
+
+def fixture_listing(index):
+    """Directory listing number index of the fixture site"""
+    return {
+        'id': index,
+        'title': f"Benchmark Restoration {index:04d}",
+        'phone': f"(555) 01{index // 100 % 10}-{index % 100:04d}",
+        'email': f"office{index}@benchmark-restoration.example",
+        'address_line1': f"{100 + index} Main Street",
+        'locality': 'Springfield',
+        'administrative_area': FIXTURE_STATES[index % len(FIXTURE_STATES)],
+        'postal_code': f"{6000 + index:05d}",
+        'country': 'United States',
+        'website': f"https://benchmark-{index}.example.com/",
+        'cid': 4000000000000000000 + index
+    }
+
+def full_address(listing):
+    """full_address the scraper builds for a fixture listing"""
+    return ' '.join([
+        listing['address_line1'], listing['locality'], listing['administrative_area'],
+        listing['postal_code'], listing['country']
+    ])
+
+def _page(title, body, script=''):
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head>"
+            f"<body>{body}<script>{script}</script></body></html>")
+
+def _field(name, label, value):
+    return (f"<div class='field field--name-field-{name} field--type-string'>"
+            f"<div class='field--label'>{label}</div><div class='field--item'>{value}</div></div>")
+
+def render_results_page(site, page):
+    """Directory search results page with a Drupal style pager (zero-based ?page=N)"""
+    listings = site.listings[page * site.page_size:(page + 1) * site.page_size]
+    rows = ''.join(
+        f"<div class='views-row'><span class='field-content'><a href='/listing/{listing['id']}'>"
+        f"{html.escape(listing['title'])}</a></span></div>"
+        for listing in listings
+    )
+    pager = ''
+    if page < site.last_page:
+        pager = (f"<a title='Go to next page' href='/directory-search?{urlencode({'page': page + 1})}'>Next</a>"
+                 f"<a title='Go to last page' href='/directory-search?{urlencode({'page': site.last_page})}'>Last</a>")
+    return _page("Directory Search | Restoration Industry Association",
+                 f"<div class='view-content'>{rows}</div><nav class='pager'>{pager}</nav>")
+
+def render_listing_page(listing):
+    """Listing detail page with the fields DETAIL_XPATHS reads and two extra fields"""
+    address = (
+        f"<p class='address'><span class='address-line1'>{listing['address_line1']}</span>"
+        f"<span class='locality'>{listing['locality']}</span> "
+        f"<span class='administrative-area'>{listing['administrative_area']}</span> "
+        f"<span class='postal-code'>{listing['postal_code']}</span>"
+        f"<span class='country'>{listing['country']}</span></p>"
+    )
+    body = (
+        f"<h1 class='page-header'>{html.escape(listing['title'])}</h1>"
+        f"<span class='organization'>{html.escape(listing['title'])}</span>{address}"
+        + _field('ams-phone', 'Phone', listing['phone'])
+        + _field('ams-email', 'Email', listing['email'])
+        + _field('ams-ind-company-desc', 'About', 'Water, fire and mold restoration since 1990.')
+        + _field('ams-master-contact', 'Contact', 'Pat Smith')
+        + _field('ams-description-plain', 'Description', '24/7 emergency response.')
+        + _field('ams-website-url', 'Website', f"<a href='{listing['website']}'>{listing['website']}</a>")
+        + _field('ams-services', 'Services', 'Water Damage, Fire Damage, Mold Remediation')
+        + _field('ams-certifications', 'Certifications', 'IICRC')
+    )
+    return _page(f"{listing['title']} | Restoration Industry Association", body)
+
+def render_google_home():
+    """Search form like the Google home page (the scraper types into the input named q)"""
+    return _page("Google", "<form action='/google/search' method='get'><input name='q' type='text'></form>")
+
+# Knowledge panel behaviour: the Reviews tab, "More" links and the photo gallery only render on click
+GOOGLE_SCRIPT = """
+document.getElementById('reviews-tab').addEventListener('click', function () {
+  document.getElementById('reviews').style.display = 'block';
+});
+document.querySelectorAll('.OA1nbd a').forEach(function (link) {
+  link.addEventListener('click', function () {
+    var review = link.parentNode;
+    link.remove();
+    review.appendChild(document.createTextNode(review.getAttribute('data-rest')));
+  });
+});
+document.getElementById('photos').addEventListener('click', function () {
+  var gallery = document.getElementById('gallery');
+  gallery.setAttribute('aria-label', 'Photo gallery');
+  gallery.style.display = 'block';
+  gallery.querySelector('img').addEventListener('click', function () {
+    var large = document.createElement('img');
+    large.setAttribute('jsaction', 'load:trigger.benchmark');
+    large.src = this.getAttribute('data-large');
+    document.body.appendChild(large);
+  });
+});
+"""
+
+def render_google_results(site, listing):
+    """Google results page with a knowledge panel for a listing, or plain results without one"""
+    results = "<div id='search'><div class='g'><a href='https://example.com/'>Result</a></div></div>"
+    if listing is None:
+        return _page("Search - Google", results)
+
+    image_base = f"/images/{listing['id']}"
+    panel_address = (f"{listing['address_line1']}, {listing['locality']}, "
+                     f"{listing['administrative_area']} {listing['postal_code']}")
+    reviews = ''.join(
+        f"<div aria-label='Rated {5 - number % 3}.0 out of 5,'></div>"
+        f"<div class='OA1nbd' data-rest=' rest of review {number} for {listing['id']}.'>"
+        f"Review {number}: prompt and careful work<a href='#'>More</a></div>"
+        for number in range(1, FIXTURE_REVIEWS + 1)
+    )
+    gallery = (
+        f"<div id='gallery' style='display:none'>"
+        f"<img src='{image_base}-thumb.jpg' data-large='{image_base}-large.jpg'>"
+        f"<img data-ils='3' jsaction='rcuQ6b:trigger.M8vzZb' src='{site.base_url}{image_base}-2.jpg'>"
+        f"<img data-ils='3' jsaction='rcuQ6b:trigger.M8vzZb' src='{site.base_url}{image_base}-3.jpg'></div>"
+    )
+    panel = (
+        f"<div id='rhs'><h2 data-attrid='title'>{html.escape(listing['title'])}</h2>"
+        f"<div class='nmrhhd luib-5'>"
+        f"<div id='photos'><span>See photos</span><img src='{image_base}-photo.jpg'></div>"
+        f"<div><span>See outside</span><img src='{image_base}-outside.jpg'></div></div>"
+        f"<img alt='Map of {html.escape(listing['title'])}' src='{image_base}-map.jpg'>"
+        f"<span class='LrzXr'>{panel_address}</span>"
+        f"<span aria-label='Call phone number {listing['phone']}'>{listing['phone']}</span>"
+        f"<a class='n1obkb mI8Pwc' href='{listing['website']}'>Website</a>"
+        f"<div><span><a href='/maps?ludocid={listing['cid']}&cid={listing['cid']}'>Directions</a></span></div>"
+        f"<span id='reviews-tab'>Reviews</span><div id='reviews' style='display:none'>{reviews}</div>"
+        f"</div>{gallery}"
+    )
+    return _page(f"{listing['title']} - Google Search", results + panel, GOOGLE_SCRIPT)
+
+class FixtureSite:
+    """Generated stand-in for the directory and Google, served from one local host"""
+
+    def __init__(self, listings=DEFAULT_LISTINGS, page_size=DEFAULT_PAGE_SIZE, latency=0.0):
+        self.listings = [fixture_listing(index) for index in range(1, listings + 1)]
+        self.page_size = page_size
+        self.last_page = max(0, (listings - 1) // page_size)
+        self.latency = latency
+        self.base_url = ''
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def find_listing(self, query):
+        """Listing a Google query is about (queries start with the listing title)"""
+        for listing in self.listings:
+            if query.startswith(listing['title']):
+                return listing
+        return None
+
+    def respond(self, path, query):
+        """(status, content type, body) for a request"""
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path == '/directory-search':
+            page = int(query.get('page', '0') or 0)
+            if page > self.last_page:
+                return 200, 'text/html', _page("Directory Search", "<div class='view-empty'>No results</div>")
+            return 200, 'text/html', render_results_page(self, page)
+        if path.startswith('/listing/'):
+            index = path.rsplit('/', 1)[-1]
+            if index.isdigit() and 1 <= int(index) <= len(self.listings):
+                return 200, 'text/html', render_listing_page(self.listings[int(index) - 1])
+        if path in ('/google', '/google/'):
+            return 200, 'text/html', render_google_home()
+        if path == '/google/search':
+            return 200, 'text/html', render_google_results(self, self.find_listing(query.get('q', '')))
+        if path.startswith('/images/'):
+            return 200, 'image/jpeg', FIXTURE_IMAGE
+        return 404, 'text/html', _page("Not found", "Not found")
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves FixtureSite pages, with an ETag so conditional requests get 304s"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        status, content_type, body = self.server.site.respond(parts.path, dict(parse_qsl(parts.query)))
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+            content_type += '; charset=utf-8'
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_server(site, port=0):
+    """Serve a FixtureSite on localhost from a background thread; returns the server"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FixtureHandler)
+    server.daemon_threads = True
+    server.site = site
+    site.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class PeakRssSampler:
+    """Track the peak resident memory of this process and everything it started (browsers included)"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        try:
+            root = psutil.Process()
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if psutil is not None:
+            self._sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def peak_mb(self):
+        """Sampled peak of the process tree, or the kernel's per-process peaks (KB on Linux) without psutil"""
+        if psutil is not None:
+            return round(self.peak_bytes / (1024 * 1024), 1)
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return round((own + children) / 1024, 1)
+
+def stage_latency(summary, *stages):
+    """{stage: {p50_seconds, p95_seconds}} for the stages that ran"""
+    return {
+        stage: {key: summary['stage'][stage][key] for key in ('count', 'p50_seconds', 'p95_seconds')}
+        for stage in stages if stage in summary['stage']
+    }
+
+def _configure_local_rate(base_url):
+    """Lift the per-host rate limit for the fixture host, so the benchmark measures the crawler"""
+    SCHEDULER.configure(host_key(base_url), rate=1000.0, max_rate=1000.0, burst=100)
+
+def run_pipeline_scenario(base_url, options):
+    """main's directory + GBP pipeline over the fixture directory"""
+    _configure_local_rate(base_url)
+    with PeakRssSampler() as sampler:
+        started = time.monotonic()
+        run_crawl(
+            start_urls=[f"{base_url}/directory-search"],
+            google_url=f"{base_url}/google/",
+            cache_ttl=0,
+            **options
+        )
+        elapsed = time.monotonic() - started
+    summary = METRICS.summary()
+    listings = summary['stage'].get(STAGE_LISTING_DETAIL, {}).get('count', 0)
+    lookups = summary['stage'].get(STAGE_GBP_LOOKUP, {}).get('count', 0)
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'listings': listings,
+        'listings_per_minute': round(listings / elapsed * 60, 1),
+        'gbp_lookups': lookups,
+        'gbp_lookups_per_minute': round(lookups / elapsed * 60, 1),
+        'latency': stage_latency(summary, STAGE_DIRECTORY_PAGE, STAGE_LISTING_DETAIL, STAGE_GBP_LOOKUP),
+        'peak_rss_mb': sampler.peak_mb()
+    }
+
+def run_gbp_scenario(base_url, options):
+    """get_google_reviews against the fixture knowledge panel, one browser, every fixture listing"""
+    _configure_local_rate(base_url)
+    site = FixtureSite(options.pop('listings'))
+    profile = options.pop('gbp_profile')
+    with PeakRssSampler() as sampler:
+        driver = setup_driver(profile)
+        try:
+            started = time.monotonic()
+            found = 0
+            for listing in site.listings:
+                row = {'url': f"{base_url}/listing/{listing['id']}", 'title': listing['title'],
+                       'phone': listing['phone'], 'full_address': full_address(listing)}
+                _, gbp_data = get_google_reviews(
+                    driver, row['title'], row['full_address'], listing=row,
+                    google_url=f"{base_url}/google/", **options
+                )
+                found += bool(gbp_data.get('gbp_title'))
+            elapsed = time.monotonic() - started
+        finally:
+            driver.quit()
+    summary = METRICS.summary()
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'gbp_lookups': len(site.listings),
+        'gbp_panels_found': found,
+        'gbp_lookups_per_minute': round(len(site.listings) / elapsed * 60, 1),
+        'latency': stage_latency(summary, STAGE_GBP_LOOKUP, STAGE_GOOGLE_SEARCH),
+        'peak_rss_mb': sampler.peak_mb()
+    }
+
+def run_images_scenario(base_url, options):
+    """download_image.process_csv and the async process_gbp_images over fixture image URLs"""
+    _configure_local_rate(base_url)
+    rows = options['listings']
+    with open('images_input.csv', 'w', newline='', encoding='utf-8') as output:
+        writer = csv.DictWriter(output, fieldnames=['name', 'image_url'])
+        writer.writeheader()
+        writer.writerows({'name': f"Business {index}", 'image_url': f"{base_url}/images/{index}-photo.jpg"}
+                         for index in range(rows))
+    with open('gbp_input.csv', 'w', newline='', encoding='utf-8') as output:
+        writer = csv.DictWriter(output, fieldnames=['url'] + IMAGE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(
+            dict({'url': f"{base_url}/listing/{index}"},
+                 **{column: f"{base_url}/images/{index}-{column}.jpg" for column in IMAGE_COLUMNS})
+            for index in range(rows)
+        )
+
+    with PeakRssSampler() as sampler:
+        started = time.monotonic()
+        process_csv('images_input.csv', 'images_output.csv', 'images', store_dir='sequential_store')
+        sequential = time.monotonic() - started
+        started = time.monotonic()
+        process_gbp_images('gbp_input.csv', 'gbp_output.csv', 'gbp_images', store_dir='async_store')
+        concurrent = time.monotonic() - started
+    return {
+        'elapsed_seconds': round(sequential + concurrent, 2),
+        'images_per_minute': round(rows * len(IMAGE_COLUMNS) / concurrent * 60, 1),
+        'sequential_images_per_minute': round(rows / sequential * 60, 1),
+        'peak_rss_mb': sampler.peak_mb()
+    }
+
+SCENARIO_FUNCTIONS = {
+    'pipeline': run_pipeline_scenario,
+    'gbp': run_gbp_scenario,
+    'images': run_images_scenario
+}
+
+def _run_in_workdir(name, base_url, options, verbose):
+    """Run one scenario inside a scratch directory, with the crawler's output in a log file"""
+    workdir = tempfile.mkdtemp(prefix=f'benchmark-{name}-')
+    os.chdir(workdir)
+    with open('output.log', 'w', encoding='utf-8') as log, \
+         (contextlib.nullcontext() if verbose else contextlib.redirect_stdout(log)):
+        result = SCENARIO_FUNCTIONS[name](base_url, options)
+    result['workdir'] = workdir
+    return result
+
+def run_scenario(name, base_url, options, verbose=False):
+    """Run a scenario in a fresh process, so metrics and peak memory belong to it alone"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_run_in_workdir, name, base_url, options, verbose).result()
+
+def p95(result):
+    """Worst p95 stage latency of a result"""
+    return max((stats['p95_seconds'] for stats in result.get('latency', {}).values()), default=None)
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Print changes against an earlier run; returns the regressions beyond the tolerance"""
+    regressions = []
+    print(f"\nAgainst baseline (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for field, higher_is_better in COMPARED_FIELDS.items():
+            new = p95(result) if field == 'p95_seconds' else result.get(field)
+            old = p95(baseline[name]) if field == 'p95_seconds' else baseline[name].get(field)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            print(f"  {name} {field}: {old} -> {new} ({change:+.0%}){'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{name} {field}")
+    return regressions
+
+def print_results(results):
+    """Print the headline numbers of every scenario"""
+    for name, result in results.items():
+        print(f"\n{name} ({result['elapsed_seconds']}s, peak RSS {result['peak_rss_mb']} MB):")
+        for field in ('listings_per_minute', 'gbp_lookups_per_minute', 'images_per_minute',
+                      'sequential_images_per_minute'):
+            if field in result:
+                print(f"  {field.replace('_', ' ')}: {result[field]}")
+        for stage, stats in result.get('latency', {}).items():
+            print(f"  {stage}: {stats['count']} runs, p50 {stats['p50_seconds']}s, p95 {stats['p95_seconds']}s")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the crawler offline against a local stand-in for the directory and Google"
+    )
+    parser.add_argument("--scenarios", nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--listings", type=int, default=DEFAULT_LISTINGS, help="fixture listings (and image rows)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="listings per directory page")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay the fixture server adds to every response")
+    parser.add_argument("--port", type=int, default=0, help="fixture server port (0 picks a free one)")
+    parser.add_argument("--serve", action='store_true', help="only run the fixture server, e.g. for manual runs of main.py")
+    parser.add_argument("--fetcher", choices=['browser', 'http'], default='browser')
+    parser.add_argument("--pagination", choices=['click', 'direct'], default='click')
+    parser.add_argument("--extraction", choices=sorted(EXTRACTORS), default='webdriver')
+    parser.add_argument("--gbp-extractor", choices=['webdriver', 'script'], default='webdriver')
+    parser.add_argument("--gbp-tier", choices=GBP_TIERS, default=TIER_FULL)
+    parser.add_argument("--stream", action='store_true', help="run the pipeline scenario in streaming mode")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--directory-profile", choices=sorted(DRIVER_PROFILES), default='directory')
+    parser.add_argument("--gbp-profile", choices=sorted(DRIVER_PROFILES), default='gbp')
+    parser.add_argument("--output", help="save the results as JSON, e.g. to use as a later --baseline")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative slowdown reported as a regression (exit status 1)")
+    parser.add_argument("--verbose", action='store_true', help="show the crawler's own output")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    site = FixtureSite(args.listings, args.page_size, args.latency_ms / 1000)
+    server = start_fixture_server(site, args.port)
+    print(f"Fixture site with {args.listings} listings at {site.base_url} "
+          f"(directory {site.base_url}/directory-search, Google {site.base_url}/google/)")
+
+    if args.serve:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    else:
+        scenario_options = {
+            'pipeline': {
+                'num_workers': args.workers, 'extraction': args.extraction, 'fetcher': args.fetcher,
+                'pagination': args.pagination, 'stream': args.stream, 'gbp_extractor': args.gbp_extractor,
+                'gbp_tier': args.gbp_tier, 'directory_profile': args.directory_profile,
+                'gbp_profile': args.gbp_profile
+            },
+            'gbp': {
+                'listings': args.listings, 'gbp_profile': args.gbp_profile,
+                'extractor': args.gbp_extractor, 'tier': args.gbp_tier
+            },
+            'images': {'listings': args.listings}
+        }
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name}...")
+            try:
+                results[name] = run_scenario(name, site.base_url, scenario_options[name], args.verbose)
+            except Exception as e:
+                print(f"Scenario {name} failed: {str(e)}")
+        print_results(results)
+        print(f"\nFixture server answered {site.requests} requests")
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2)
+        regressions = []
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as baseline_file:
+                regressions = compare(results, json.load(baseline_file), args.tolerance)
+        server.shutdown()
+        if regressions:
+            raise SystemExit(f"Regressions: {', '.join(regressions)}")
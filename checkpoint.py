@@ -0,0 +1,222 @@
+import json
+import sqlite3
+import threading
+import time
+from functions import write_csv
+from review_harvest import REVIEW_FIELDNAMES
+
+# Default location of the crawl state database
+DEFAULT_STATE_DB = 'crawl_state.db'
+
+# Listing statuses
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_DUPLICATE = 'duplicate'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS start_urls (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listing_urls (
+    url TEXT PRIMARY KEY,
+    start_url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    url TEXT PRIMARY KEY,
+    data TEXT,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gbp_results (
+    url TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    listing_url TEXT NOT NULL,
+    review_index INTEGER NOT NULL,
+    rating TEXT,
+    text TEXT NOT NULL,
+    PRIMARY KEY (listing_url, review_index)
+);
+"""
+
+class CrawlState:
+    """SQLite-backed record of crawl progress, so an interrupted run can resume"""
+
+    def __init__(self, path=DEFAULT_STATE_DB, resume=False):
+        self.path = path
+        # Shared by the worker/pipeline threads, so serialize access ourselves
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            if not resume:
+                # A fresh run starts from an empty state
+                for table in ('start_urls', 'listing_urls', 'listings', 'gbp_results', 'reviews'):
+                    self._conn.execute(f"DELETE FROM {table}")
+
+    def _query(self, sql, params=()):
+        """Run a read query and return all rows"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        """Run a write statement in its own transaction"""
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    # Directory pagination
+
+    def is_start_url_done(self, start_url):
+        """True if every result page of this start URL was already collected"""
+        rows = self._query("SELECT status FROM start_urls WHERE url = ?", (start_url,))
+        return bool(rows) and rows[0][0] == STATUS_DONE
+
+    def save_start_url(self, start_url, listing_urls):
+        """Record the listing URLs collected for a start URL and mark it done"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO listing_urls (url, start_url, position, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(url, start_url, position, STATUS_PENDING, now) for position, url in enumerate(listing_urls)]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO start_urls (url, status, updated_at) VALUES (?, ?, ?)",
+                (start_url, STATUS_DONE, now)
+            )
+
+    def get_listing_urls(self, start_url):
+        """Listing URLs collected for a start URL, in page order"""
+        rows = self._query(
+            "SELECT url FROM listing_urls WHERE start_url = ? ORDER BY position", (start_url,)
+        )
+        return [row[0] for row in rows]
+
+    # Listing details
+
+    def get_listing_status(self, url):
+        """Status of an extracted listing, or None if it was never extracted"""
+        rows = self._query("SELECT status FROM listings WHERE url = ?", (url,))
+        return rows[0][0] if rows else None
+
+    def get_listing(self, url):
+        """Stored listing data for a URL, or None"""
+        rows = self._query("SELECT data FROM listings WHERE url = ? AND status = ?", (url, STATUS_DONE))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_listing(self, url, data, status=STATUS_DONE):
+        """Record an extracted listing (or that it was dropped as a duplicate)"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings (url, data, status, updated_at) VALUES (?, ?, ?, ?)",
+                (url, json.dumps(data) if data is not None else None, status, now)
+            )
+            self._conn.execute(
+                "UPDATE listing_urls SET status = ?, updated_at = ? WHERE url = ?", (status, now, url)
+            )
+
+    def get_listings(self):
+        """All extracted listings, in the order they were first stored"""
+        rows = self._query("SELECT data FROM listings WHERE status = ? ORDER BY rowid", (STATUS_DONE,))
+        return [json.loads(row[0]) for row in rows]
+
+    # Google Business Profile results
+
+    def is_gbp_done(self, url):
+        """True if the GBP lookup for this listing already completed"""
+        rows = self._query("SELECT status FROM gbp_results WHERE url = ?", (url,))
+        return bool(rows) and rows[0][0] == STATUS_DONE
+
+    def save_gbp_result(self, url, row):
+        """Record the listing row merged with its GBP data"""
+        self._write(
+            "INSERT OR REPLACE INTO gbp_results (url, data, status, updated_at) VALUES (?, ?, ?, ?)",
+            (url, json.dumps(row), STATUS_DONE, time.time())
+        )
+
+    def get_gbp_result(self, url):
+        """Stored listing row merged with its GBP data, or None"""
+        rows = self._query("SELECT data FROM gbp_results WHERE url = ? AND status = ?", (url, STATUS_DONE))
+        return json.loads(rows[0][0]) if rows else None
+
+    def get_gbp_rows(self):
+        """(url, row) for every listing whose GBP lookup completed"""
+        rows = self._query("SELECT url, data FROM gbp_results WHERE status = ? ORDER BY rowid", (STATUS_DONE,))
+        return [(url, json.loads(data)) for url, data in rows]
+
+    def get_gbp_results(self):
+        """One row per listing, merged with its GBP data where the lookup completed"""
+        rows = self._query(
+            "SELECT l.data, g.data FROM listings l "
+            "LEFT JOIN gbp_results g ON g.url = l.url AND g.status = ? "
+            "WHERE l.status = ? ORDER BY l.rowid", (STATUS_DONE, STATUS_DONE)
+        )
+        return [json.loads(gbp_data if gbp_data is not None else listing_data) for listing_data, gbp_data in rows]
+
+    # Harvested reviews
+
+    def clear_reviews(self, listing_url):
+        """Drop the reviews of a listing before it is harvested again"""
+        self._write("DELETE FROM reviews WHERE listing_url = ?", (listing_url,))
+
+    def save_review(self, listing_url, review_index, text, rating):
+        """Record one harvested review; a retried harvest replaces it rather than adding a copy"""
+        self._write(
+            "INSERT OR REPLACE INTO reviews (listing_url, review_index, rating, text) VALUES (?, ?, ?, ?)",
+            (listing_url, review_index, rating, text)
+        )
+
+    def iter_reviews(self):
+        """Harvested reviews one at a time, grouped by listing in harvest order"""
+        # A separate read connection streams the rows without holding the writers' lock (WAL allows both)
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(
+                "SELECT listing_url, review_index, rating, text FROM reviews ORDER BY listing_url, review_index"
+            )
+            for row in cursor:
+                yield dict(zip(REVIEW_FIELDNAMES, row))
+        finally:
+            conn.close()
+
+    # Output
+
+    def export_listings(self, filename='restoration_listings.csv'):
+        """Rewrite the listings CSV from the store, with no partial or duplicate rows"""
+        listings = self.get_listings()
+        write_csv(listings, filename)
+        return len(listings)
+
+    def export_gbp_results(self, filename='restoration_listings_with_reviews.csv'):
+        """Rewrite the listings-with-reviews CSV from the store"""
+        rows = self.get_gbp_results()
+        write_csv(rows, filename)
+        return len(rows)
+
+    def export_reviews(self, filename):
+        """Rewrite the normalized reviews CSV from the store"""
+        return write_csv(self.iter_reviews(), filename, REVIEW_FIELDNAMES)
+
+    def print_summary(self):
+        """Print how much work is recorded in the store"""
+        listing_urls = self._query("SELECT COUNT(*) FROM listing_urls")[0][0]
+        listings = self._query("SELECT COUNT(*) FROM listings WHERE status = ?", (STATUS_DONE,))[0][0]
+        gbp = self._query("SELECT COUNT(*) FROM gbp_results WHERE status = ?", (STATUS_DONE,))[0][0]
+        print(f"\nCrawl state ({self.path}): {listing_urls} listing URLs, "
+              f"{listings} listings extracted, {gbp} GBP lookups done")
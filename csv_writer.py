@@ -0,0 +1,104 @@
+import csv
+import io
+import os
+import threading
+import time
+
+# CSV columns shared by the listings and the listings-with-reviews files
+CSV_FIELDNAMES = [
+    'url', 'title', 'phone', 'email', 'organization',
+    'address_line1', 'address_line2', 'locality',
+    'administrative_area', 'postal_code', 'country',
+    'full_address', 'about', 'contact', 'description', 'website',
+    'gbp_title', 'gbp_address', 'gbp_phone', 'gbp_website', 
+    'gbp_image', 'gbp_map_image', 'gbp_outside_image',
+    'gbp_maps_url', 'extra_fields',
+    'review_1', 'review_2', 'review_3', 'review_4', 'review_5',
+    'review_rating_1', 'review_rating_2', 'review_rating_3', 'review_rating_4', 'review_rating_5',
+    'gbp_embedded_url_1', 'gbp_embedded_url_2', 'gbp_embedded_url_3'
+]
+
+# GBP image URL columns of the listings-with-reviews file (downloaded by download_image.py)
+IMAGE_COLUMNS = [
+    'gbp_image', 'gbp_map_image', 'gbp_outside_image',
+    'gbp_embedded_url_1', 'gbp_embedded_url_2', 'gbp_embedded_url_3'
+]
+
+# Rows buffered before they are written to disk
+DEFAULT_BATCH_SIZE = 100
+
+# Seconds after which buffered rows are written even if the batch is not full
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+class CsvBatchWriter:
+    """Append rows to a CSV file through one open handle, writing them in batches"""
+
+    def __init__(self, filename, fieldnames=CSV_FIELDNAMES, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._lock = threading.Lock()
+
+        # Header only for a file that does not exist yet
+        file_exists = os.path.isfile(filename)
+        self._file = open(filename, 'a', newline='', encoding='utf-8')
+
+        # Rows are formatted into an in-memory buffer, so bad rows fail immediately
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=fieldnames)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        if not file_exists:
+            self._writer.writeheader()
+            self._flush_buffer()
+
+    def writerow(self, data):
+        """Buffer one row, flushing when the batch is full or the interval has passed"""
+        with self._lock:
+            try:
+                # Flatten extra_fields on a copy; callers keep using the dict (GBP stage, output sinks)
+                if isinstance(data.get('extra_fields'), dict):
+                    data = dict(data, extra_fields=str(data['extra_fields']))
+                self._writer.writerow(data)
+                self._pending += 1
+            except Exception as e:
+                print(f"Error saving to CSV: {str(e)}")
+                return
+
+            if (self._pending >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_buffer()
+
+    def _flush_buffer(self):
+        """Write buffered rows to the file (caller holds the lock)"""
+        data = self._buffer.getvalue()
+        if data:
+            self._file.write(data)
+            self._file.flush()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        self.rows_written += self._pending
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write all buffered rows to disk"""
+        with self._lock:
+            self._flush_buffer()
+
+    def close(self):
+        """Flush remaining rows and close the file"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush_buffer()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,90 @@
+import re
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that never change which listing a URL points to
+IGNORED_QUERY_PARAMS = {'page', 'fbclid', 'gclid'}
+
+# Common street suffix spellings folded to one form for address comparison
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'highway': 'hwy', 'parkway': 'pkwy',
+    'suite': 'ste', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'united states': 'us', 'usa': 'us'
+}
+
+def canonicalize_url(url):
+    """Normalize a listing URL so the same page always maps to the same key"""
+    parts = urlsplit((url or '').strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in IGNORED_QUERY_PARAMS and not key.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower() or 'https', parts.netloc.lower(), path, urlencode(query), ''))
+
+def normalize_phone(phone):
+    """Reduce a phone number to its digits, dropping a leading US country code"""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+def normalize_address(address):
+    """Lowercase an address, strip punctuation and fold common abbreviations"""
+    text = re.sub(r'[^a-z0-9 ]', ' ', (address or '').lower())
+    text = ' '.join(text.split())
+    for word, abbreviation in ADDRESS_ABBREVIATIONS.items():
+        text = re.sub(rf'\b{word}\b', abbreviation, text)
+    return text
+
+def record_key(data):
+    """Normalized phone + address identifying a business across listing URLs, or None if either is missing"""
+    phone = normalize_phone(data.get('phone'))
+    address = normalize_address(data.get('full_address'))
+    if not phone or not address:
+        return None
+    return f"{phone}|{address}"
+
+class ListingIndex:
+    """Global seen-set of listing URLs and phone+address keys across all searches"""
+
+    def __init__(self):
+        self.seen_urls = set()
+        self.seen_records = set()
+        self.duplicate_urls = 0
+        self.duplicate_records = 0
+        self._lock = threading.Lock()
+
+    def filter_new_urls(self, urls):
+        """Return only URLs not seen before (in order) and remember them"""
+        new_urls = []
+        with self._lock:
+            for url in urls:
+                key = canonicalize_url(url)
+                if key in self.seen_urls:
+                    self.duplicate_urls += 1
+                    continue
+                self.seen_urls.add(key)
+                new_urls.append(url)
+        return new_urls
+
+    def is_duplicate_listing(self, data):
+        """Check a listing against previously seen phone+address pairs and remember it"""
+        key = record_key(data)
+        if key is None:
+            return False
+
+        with self._lock:
+            if key in self.seen_records:
+                self.duplicate_records += 1
+                return True
+            self.seen_records.add(key)
+        return False
+
+    def print_report(self):
+        """Print how much work deduplication saved"""
+        print(f"\nDeduplication: {len(self.seen_urls)} unique listing URLs")
+        print(f"  Skipped {self.duplicate_urls} duplicate listing fetches")
+        print(f"  Skipped {self.duplicate_records} duplicate listings by phone + address")
+        print(f"  Saved {self.duplicate_urls + self.duplicate_records} Google lookups")
@@ -0,0 +1,296 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import socket
+import time
+from functools import partial
+from driver_setup import setup_driver, DRIVER_PROFILES
+from driver_supervisor import DriverSupervisor
+from functions import add_google_data_to_row, write_csv, GBP_TIERS, TIER_FULL
+from gbp_match import DEFAULT_MIN_CONFIDENCE
+from gbp_cache import GbpCache, DEFAULT_CACHE_DB
+from pagination import collect_listing_urls_direct
+from http_fetcher import DEFAULT_CONCURRENCY
+from dedupe import ListingIndex, canonicalize_url, record_key
+from rate_limiter import SCHEDULER, host_key
+from xpaths import BASE_URL
+from geo_planner import plan_search_urls, STATES
+from work_queue import open_queue, DEFAULT_QUEUE_DB, DEFAULT_LEASE
+from main import collect_listing_urls, EXTRACTORS
+
+# Task kinds, in pipeline order
+KIND_START_URL = 'start_url'
+KIND_LISTING = 'listing'
+KIND_GBP = 'gbp'
+TASK_KINDS = (KIND_START_URL, KIND_LISTING, KIND_GBP)
+
+# Folder the workers write their partial outputs to
+DEFAULT_OUTPUT_DIR = 'partials'
+
+# Seconds an idle worker waits before asking the queue again
+POLL_INTERVAL = 5
+
+# Google lookups that find nothing are tried this many times before the row is written without GBP data
+GBP_ATTEMPTS = 2
+
+def seed(queue, regions):
+    """Put the planned directory searches on the queue"""
+    urls = plan_search_urls(regions)
+    queue.put_many(KIND_START_URL, [(url, '') for url in urls])
+    print(f"Queued {len(urls)} start URLs")
+
+class Worker:
+    """One crawl process: claims tasks, runs them on its own browsers and appends results to a partial file"""
+
+    def __init__(self, queue, worker_id, output_dir, extraction='webdriver', pagination='click',
+                 directory_profile='default', gbp_profile='default', lease=DEFAULT_LEASE, cache=None,
+                 **lookup_options):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.extract_fn = EXTRACTORS[extraction]
+        self.pagination = pagination
+        self.directory_profile = directory_profile
+        self.gbp_profile = gbp_profile
+        self.lease = lease
+        self.cache = cache
+        self.lookup_options = lookup_options
+        self.completed = 0
+        self._supervisors = {}
+        os.makedirs(output_dir, exist_ok=True)
+        self._output = open(os.path.join(output_dir, f"{worker_id}.jsonl"), 'a', encoding='utf-8')
+
+    def _supervisor(self, phase):
+        """Browser for a phase, started on first use"""
+        if phase not in self._supervisors:
+            profile = self.directory_profile if phase == 'directory' else self.gbp_profile
+            self._supervisors[phase] = DriverSupervisor(
+                partial(setup_driver, profile), name=f'{self.worker_id} {phase} browser'
+            )
+        return self._supervisors[phase]
+
+    def _write(self, record_type, task, url, data):
+        """Append one result to this worker's partial output"""
+        record = {'type': record_type, 'task_id': task.id, 'url': url, 'data': data}
+        self._output.write(json.dumps(record) + '\n')
+        self._output.flush()
+
+    def handle_start_url(self, task):
+        """Collect the listing URLs of a directory search and queue them"""
+        if self.pagination == 'direct':
+            urls = collect_listing_urls_direct(task.key, DEFAULT_CONCURRENCY)
+        else:
+            urls = self._supervisor('directory').run(collect_listing_urls, task.key)
+        if not urls:
+            raise Exception("no listing URLs collected")
+        # Keys are canonical, so a listing found by overlapping searches is queued once
+        self.queue.put_many(KIND_LISTING, [(canonicalize_url(url), url) for url in urls])
+        print(f"[{self.worker_id}] Queued {len(urls)} listing URLs from {task.key}")
+
+    def handle_listing(self, task):
+        """Extract one listing and queue its Google lookup"""
+        url = task.payload or task.key
+        data = self._supervisor('directory').run(self.extract_fn, url)
+        if not data:
+            raise Exception("listing extraction failed")
+        self._write(KIND_LISTING, task, url, data)
+        # Keyed by phone + address, so a business listed under several URLs is looked up once
+        self.queue.put(KIND_GBP, record_key(data) or task.key, json.dumps(data))
+
+    def handle_gbp(self, task):
+        """Look up one listing on Google"""
+        row = json.loads(task.payload)
+        found = self._supervisor('gbp').run(add_google_data_to_row, row, self.cache, **self.lookup_options)
+        if not found and task.attempts < GBP_ATTEMPTS:
+            # Give a failed lookup one more try, possibly on another node
+            raise Exception("no GBP data found")
+        self._write(KIND_GBP, task, row['url'], row)
+
+    def run(self, kinds=TASK_KINDS):
+        """Work until the whole queue is drained"""
+        handlers = {
+            KIND_START_URL: self.handle_start_url,
+            KIND_LISTING: self.handle_listing,
+            KIND_GBP: self.handle_gbp
+        }
+        try:
+            while True:
+                task = self.queue.claim(self.worker_id, kinds, self.lease)
+                if task is None:
+                    # Upstream tasks of other workers may still produce work for us
+                    if not self.queue.has_open_tasks(TASK_KINDS):
+                        break
+                    time.sleep(POLL_INTERVAL)
+                    continue
+
+                print(f"[{self.worker_id}] {task.kind} {task.key} (attempt {task.attempts})")
+                try:
+                    handlers[task.kind](task)
+                    self.queue.complete(task.id)
+                    self.completed += 1
+                except Exception as e:
+                    print(f"[{self.worker_id}] {task.kind} {task.key} failed: {str(e)}")
+                    self.queue.fail(task.id, e)
+        finally:
+            self.close()
+        print(f"[{self.worker_id}] Finished after {self.completed} tasks")
+
+    def close(self):
+        """Quit the browsers and close the partial output"""
+        for supervisor in self._supervisors.values():
+            supervisor.quit()
+        self._supervisors = {}
+        self._output.close()
+
+def configure_rates(rate_share, directory_rate=None, google_rate=None):
+    """Set this process's request rates to its share of the whole job's rates"""
+    if directory_rate:
+        SCHEDULER.configure(host_key(BASE_URL), rate=directory_rate)
+    if google_rate:
+        SCHEDULER.configure('google.com', rate=google_rate)
+    SCHEDULER.scale(rate_share)
+
+def run_worker(queue_url, worker_id, output_dir, kinds=TASK_KINDS, cache_db=None, rate_share=1.0,
+               directory_rate=None, google_rate=None, **options):
+    """Entry point of one worker process"""
+    # Every process paces itself, so together they stay within the configured rates
+    configure_rates(rate_share, directory_rate, google_rate)
+    queue = open_queue(queue_url)
+    cache = GbpCache(cache_db) if cache_db else None
+    try:
+        Worker(queue, worker_id, output_dir, cache=cache, **options).run(kinds)
+    finally:
+        queue.close()
+        if cache is not None:
+            cache.close()
+
+def run_workers(queue_url, processes, output_dir, kinds=TASK_KINDS, total_workers=None, **options):
+    """Start worker processes on this node and wait for them to drain the queue"""
+    node = socket.gethostname()
+    # The request rates are split over every worker of the job, on all nodes
+    options['rate_share'] = 1.0 / max(1, total_workers or processes)
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(queue_url, f"{node}-{os.getpid()}-{index}", output_dir, kinds),
+            kwargs=options
+        )
+        for index in range(1, processes + 1)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+def merge(output_dir, listings_file='restoration_listings.csv',
+          reviews_file='restoration_listings_with_reviews.csv'):
+    """Combine every worker's partial output into the two CSV files"""
+    listings = {}
+    gbp_rows = {}
+    gbp_rows_by_record = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, '*.jsonl'))):
+        with open(path, encoding='utf-8') as partial_file:
+            for line in partial_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A worker killed mid-write leaves a truncated last line
+                    continue
+                target = listings if record['type'] == KIND_LISTING else gbp_rows
+                target[record['url']] = (record['task_id'], record['data'])
+                if record['type'] == KIND_GBP and record_key(record['data']):
+                    gbp_rows_by_record[record_key(record['data'])] = record['data']
+
+    # Queue order is discovery order, like a single-machine run
+    listing_index = ListingIndex()
+    merged_listings = []
+    merged_rows = []
+    for url, (_, data) in sorted(listings.items(), key=lambda item: item[1][0]):
+        if listing_index.is_duplicate_listing(data):
+            continue
+        merged_listings.append(dict(data))
+        if url in gbp_rows:
+            merged_rows.append(gbp_rows[url][1])
+        elif record_key(data) in gbp_rows_by_record:
+            # Looked up under another URL of the same business; keep this listing's own fields
+            merged_rows.append({**gbp_rows_by_record[record_key(data)], **data})
+        else:
+            merged_rows.append(data)
+
+    write_csv(merged_listings, listings_file)
+    write_csv(merged_rows, reviews_file)
+    print(f"Merged {len(merged_listings)} listings ({len(gbp_rows)} looked up on Google, "
+          f"{listing_index.duplicate_records} duplicates dropped) from {output_dir}")
+
+def print_status(queue):
+    """Print task counts per kind and status"""
+    counts = queue.counts()
+    for kind in TASK_KINDS:
+        statuses = {status: count for (task_kind, status), count in counts.items() if task_kind == kind}
+        print(f"{kind}: " + (', '.join(f"{count} {status}" for status, count in sorted(statuses.items())) or 'none'))
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Run the crawl as a sharded job over a shared work queue")
+    parser.add_argument(
+        "command", choices=['seed', 'work', 'merge', 'status'],
+        help="'seed' queues the start URLs, 'work' runs workers, 'merge' combines partial outputs"
+    )
+    parser.add_argument(
+        "--queue", default=f"sqlite:///{DEFAULT_QUEUE_DB}",
+        help="work queue URL; every node must point at the same queue"
+    )
+    parser.add_argument("--states", nargs='+', default=['CT', 'ME', 'NH'], help="states to seed, or 'all'")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to run on this node")
+    parser.add_argument(
+        "--total-workers", type=int,
+        help="worker processes across all nodes, which share the request rates (default: --processes)"
+    )
+    parser.add_argument("--directory-rate", type=float, help="requests/second to the directory for the whole job")
+    parser.add_argument("--google-rate", type=float, help="requests/second to Google for the whole job")
+    parser.add_argument(
+        "--kinds", nargs='+', choices=TASK_KINDS, default=list(TASK_KINDS),
+        help="task kinds this node works on, e.g. only 'gbp' on nodes with their own Google quota"
+    )
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="folder of the workers' partial outputs")
+    parser.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE,
+                        help="time a worker may hold a task before others take it over")
+    parser.add_argument("--extraction", choices=sorted(EXTRACTORS), default='webdriver')
+    parser.add_argument("--pagination", choices=['click', 'direct'], default='click')
+    parser.add_argument("--directory-profile", choices=sorted(DRIVER_PROFILES), default='default')
+    parser.add_argument("--gbp-profile", choices=sorted(DRIVER_PROFILES), default='default')
+    parser.add_argument("--gbp-tier", choices=GBP_TIERS, default=TIER_FULL)
+    parser.add_argument("--gbp-extractor", choices=['webdriver', 'script'], default='webdriver')
+    parser.add_argument("--min-match-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--gbp-cache-db", default=DEFAULT_CACHE_DB,
+                        help="GBP lookup cache (SQLite, so only shared between processes on one node)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == 'merge':
+        merge(args.output_dir)
+    elif args.command == 'work':
+        run_workers(
+            args.queue, args.processes, args.output_dir, tuple(args.kinds),
+            total_workers=args.total_workers,
+            directory_rate=args.directory_rate,
+            google_rate=args.google_rate,
+            cache_db=args.gbp_cache_db,
+            lease=args.lease_seconds,
+            extraction=args.extraction,
+            pagination=args.pagination,
+            directory_profile=args.directory_profile,
+            gbp_profile=args.gbp_profile,
+            tier=args.gbp_tier,
+            extractor=args.gbp_extractor,
+            min_confidence=args.min_match_confidence
+        )
+    else:
+        queue = open_queue(args.queue)
+        if args.command == 'seed':
+            seed(queue, list(STATES) if args.states == ['all'] else args.states)
+        else:
+            print_status(queue)
+        queue.close()
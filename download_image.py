@@ -1,16 +1,63 @@
+import asyncio
+import argparse
+import base64
 import csv
 import os
+import re
+import aiohttp
 import requests
 from urllib.parse import urlparse
+from http_settings import HEADERS, REQUEST_TIMEOUT
+from image_store import ImageStore, DEFAULT_STORE_DIR
+from csv_writer import IMAGE_COLUMNS
+from rate_limiter import SCHEDULER, is_block_page
 
-def download_image(image_url, save_path):
+# Maximum images downloading at the same time
+DEFAULT_CONCURRENCY = 32
+
+# Bytes read from the response per write
+CHUNK_SIZE = 64 * 1024
+
+# Per-request limits in seconds
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=10, sock_read=20)
+
+# Attempts per image, retrying on these statuses and on connection errors
+MAX_ATTEMPTS = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Extensions for the content types Google serves images with
+IMAGE_EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp', 'image/gif': '.gif'}
+
+def download_image(image_url, save_path, store=None):
+    store = store or ImageStore()
+    entry = store.lookup(image_url)
+    if entry is not None and store.is_fresh(entry):
+        return store.link(entry['path'], save_path)
     try:
-        response = requests.get(image_url, stream=True)
+        SCHEDULER.acquire(image_url)
+        response = requests.get(
+            image_url, stream=True, timeout=REQUEST_TIMEOUT, headers=store.conditional_headers(entry)
+        )
+        if is_block_page(status_code=response.status_code):
+            SCHEDULER.record_block(image_url)
+        else:
+            SCHEDULER.record_success(image_url)
+        if response.status_code == 304 and entry is not None:
+            store.mark_not_modified(image_url)
+            return store.link(entry['path'], save_path)
         if response.status_code == 200:
-            with open(save_path, 'wb') as out_file:
-                for chunk in response.iter_content(1024):
-                    out_file.write(chunk)
-            return save_path
+            writer = store.open_writer()
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    writer.write(chunk)
+            except Exception:
+                writer.discard()
+                raise
+            blob_path = store.commit(
+                image_url, writer, os.path.splitext(save_path)[1] or '.jpg',
+                response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+            return store.link(blob_path, save_path)
         else:
             print(f"Failed to download image: {image_url}")
             return None
@@ -18,9 +65,10 @@ def download_image(image_url, save_path):
         print(f"Error downloading image: {e}")
         return None
 
-def process_csv(input_csv, output_csv, image_folder):
+def process_csv(input_csv, output_csv, image_folder, store_dir=DEFAULT_STORE_DIR):
     if not os.path.exists(image_folder):
         os.makedirs(image_folder)
+    store = ImageStore(store_dir)
 
     with open(input_csv, mode='r', newline='', encoding='utf-8') as infile,\
          open(output_csv, mode='w', newline='', encoding='utf-8') as outfile:
@@ -31,14 +79,15 @@ def process_csv(input_csv, output_csv, image_folder):
         
         writer.writeheader()
         
-        for row in reader:
+        for index, row in enumerate(reader):
             try:
                 image_url = row['image_url']
                 name = row['name']
-                image_name = f"{name}_image.jpg"
+                # Row number keeps businesses with the same name from overwriting each other
+                image_name = f"{index:06d}_{safe_filename(name)}_image.jpg"
                 image_path = os.path.join(image_folder, image_name)
                 
-                downloaded_image_path = download_image(image_url, image_path)
+                downloaded_image_path = download_image(image_url, image_path, store)
                 if downloaded_image_path:
                     row['image_path'] = downloaded_image_path
                 else:
@@ -53,8 +102,163 @@ def process_csv(input_csv, output_csv, image_folder):
                 # Write the row even if there was an error
                 writer.writerow(row)
 
-# Example usage
-input_csv = 'input.csv'
-output_csv = 'output.csv'
-image_folder = 'downloaded_images'
-process_csv(input_csv, output_csv, image_folder)
+    store.print_stats()
+    store.close()
+
+def safe_filename(text):
+    """Turn a business name into something usable in a file name"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', text or '').strip('_')[:60] or 'listing'
+
+def save_data_url(store, image_url):
+    """Store an inline data: image (Google embeds small thumbnails this way)"""
+    header, _, payload = image_url.partition(',')
+    extension = IMAGE_EXTENSIONS.get(header[5:].split(';')[0], '.jpg')
+    data = base64.b64decode(payload) if ';base64' in header else payload.encode()
+    return store.put_bytes(data, extension)
+
+async def run_blocking(func, *args):
+    """Run a store call (file writes, SQLite) on the default thread pool instead of the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+async def fetch_into_store(session, semaphore, store, image_url):
+    """Get one image into the store and return its stored path, retrying transient errors"""
+    if image_url.startswith('data:'):
+        try:
+            return await run_blocking(save_data_url, store, image_url)
+        except Exception as e:
+            print(f"Error decoding inline image: {e}")
+            return None
+
+    # Known URLs are reused as they are, or revalidated instead of downloaded again
+    entry = await run_blocking(store.lookup, image_url)
+    if entry is not None and store.is_fresh(entry):
+        return entry['path']
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            # Pace the image host outside the semaphore, so waiting requests hold no connection slot
+            wait = SCHEDULER.reserve(image_url)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with semaphore:
+                async with session.get(image_url, headers=store.conditional_headers(entry)) as response:
+                    if is_block_page(status_code=response.status):
+                        SCHEDULER.record_block(image_url)
+                    else:
+                        SCHEDULER.record_success(image_url)
+                    if response.status == 304 and entry is not None:
+                        await run_blocking(store.mark_not_modified, image_url)
+                        return entry['path']
+                    if response.status in RETRY_STATUSES and attempt < MAX_ATTEMPTS:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    if response.status != 200:
+                        print(f"Failed to download image: {image_url} (HTTP {response.status})")
+                        return None
+
+                    content_type = response.headers.get('Content-Type', '').split(';')[0]
+                    writer = await run_blocking(store.open_writer)
+                    try:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            await run_blocking(writer.write, chunk)
+                    except BaseException:
+                        await run_blocking(writer.discard)
+                        raise
+                    return await run_blocking(
+                        store.commit, image_url, writer, IMAGE_EXTENSIONS.get(content_type, '.jpg'),
+                        response.headers.get('ETag'), response.headers.get('Last-Modified')
+                    )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == MAX_ATTEMPTS:
+                print(f"Error downloading image {image_url}: {e!r}")
+                return None
+            # Back off before the next attempt, outside the semaphore
+            await asyncio.sleep(2 ** (attempt - 1))
+    return None
+
+async def download_image_async(session, semaphore, store, image_url, save_path, in_flight):
+    """Link one image as save_path (plus extension), fetching each distinct URL only once per run"""
+    if image_url not in in_flight:
+        in_flight[image_url] = asyncio.ensure_future(fetch_into_store(session, semaphore, store, image_url))
+    blob_path = await in_flight[image_url]
+    if not blob_path:
+        return None
+    return await run_blocking(store.link, blob_path, save_path + os.path.splitext(blob_path)[1])
+
+async def _download_row_images(session, semaphore, store, index, row, image_folder, columns, in_flight):
+    """Download every image of one row and add a <column>_path column for each"""
+    base_name = f"{index:06d}_{safe_filename(row.get('title'))}"
+    urls = [row.get(column) or '' for column in columns]
+    paths = await asyncio.gather(*[
+        download_image_async(
+            session, semaphore, store, url, os.path.join(image_folder, f"{base_name}_{column}"), in_flight
+        )
+        if url else asyncio.sleep(0, result=None)
+        for column, url in zip(columns, urls)
+    ])
+    for column, path in zip(columns, paths):
+        row[f'{column}_path'] = path or ''
+    return row
+
+async def process_gbp_images_async(input_csv, output_csv, image_folder, columns=IMAGE_COLUMNS,
+                                   concurrency=DEFAULT_CONCURRENCY, store_dir=DEFAULT_STORE_DIR):
+    """Download all GBP images of a CSV concurrently over pooled connections, writing rows in input order"""
+    os.makedirs(image_folder, exist_ok=True)
+    store = ImageStore(store_dir)
+
+    with open(input_csv, mode='r', newline='', encoding='utf-8') as infile:
+        reader = csv.DictReader(infile)
+        fieldnames = reader.fieldnames + [f'{column}_path' for column in columns]
+        rows = list(reader)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # Map tiles and stock photos repeat across rows: one fetch per distinct URL
+    in_flight = {}
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=DOWNLOAD_TIMEOUT, headers=HEADERS) as session:
+        tasks = [
+            asyncio.ensure_future(_download_row_images(
+                session, semaphore, store, index, row, image_folder, columns, in_flight
+            ))
+            for index, row in enumerate(rows)
+        ]
+        with open(output_csv, mode='w', newline='', encoding='utf-8') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+
+            # Rows finish out of order; awaiting them in order keeps the output aligned with the input
+            downloaded = 0
+            for task in tasks:
+                row = await task
+                downloaded += sum(1 for column in columns if row[f'{column}_path'])
+                writer.writerow(row)
+
+    print(f"Saved {downloaded} images for {len(rows)} rows into {image_folder}")
+    store.print_stats()
+    store.close()
+
+def process_gbp_images(input_csv='restoration_listings_with_reviews.csv',
+                       output_csv='restoration_listings_with_images.csv',
+                       image_folder='downloaded_images', concurrency=DEFAULT_CONCURRENCY,
+                       store_dir=DEFAULT_STORE_DIR):
+    """Download all GBP images of a CSV (see process_gbp_images_async)"""
+    asyncio.run(process_gbp_images_async(
+        input_csv, output_csv, image_folder, concurrency=concurrency, store_dir=store_dir
+    ))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the Google Business Profile images of a listings CSV")
+    parser.add_argument("--input", default='restoration_listings_with_reviews.csv', help="CSV with GBP image columns")
+    parser.add_argument("--output", default='restoration_listings_with_images.csv', help="CSV written with image paths")
+    parser.add_argument(
+        "--image-folder", default='downloaded_images', help="folder of per-row image names (hard links into the store)"
+    )
+    parser.add_argument(
+        "--store-dir", default=DEFAULT_STORE_DIR, help="content-addressed store holding each unique image once"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="maximum images downloading at the same time"
+    )
+    args = parser.parse_args()
+    process_gbp_images(args.input, args.output, args.image_folder, args.concurrency, args.store_dir)
@@ -3,7 +3,52 @@ from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.options import Options
 
-def setup_driver():
-    
-    driver = webdriver.Chrome()
-    return driver 
\ No newline at end of file
+# URL patterns per resource category, blocked through the DevTools protocol
+BLOCK_PATTERNS = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com*', '*fonts.gstatic.com*'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav', '*.m3u8'],
+    'analytics': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+        '*facebook.net*', '*connect.facebook.com*', '*hotjar.com*', '*newrelic.com*', '*nr-data.net*'
+    ]
+}
+ALL_RESOURCES = tuple(BLOCK_PATTERNS)
+
+# Named browser setups: the directory phase runs fully stripped, the GBP phase keeps
+# images loading so panel and gallery image URLs still resolve
+DRIVER_PROFILES = {
+    'default': {},
+    'headless': {'headless': True},
+    'directory': {'headless': True, 'page_load_strategy': 'eager', 'block': ALL_RESOURCES},
+    'gbp': {'headless': True, 'page_load_strategy': 'eager', 'block': ('fonts', 'media', 'analytics')}
+}
+
+# Google only renders the knowledge panel next to the results on a wide window
+WINDOW_SIZE = '1920,1080'
+
+def build_options(profile):
+    """Chrome options for a driver profile"""
+    settings = DRIVER_PROFILES[profile]
+    options = Options()
+    if settings.get('headless'):
+        options.add_argument('--headless=new')
+        options.add_argument(f'--window-size={WINDOW_SIZE}')
+    if settings.get('page_load_strategy'):
+        options.page_load_strategy = settings['page_load_strategy']
+    return options
+
+def set_blocked_resources(driver, categories=()):
+    """Block requests for the given resource categories (an empty list unblocks everything)"""
+    patterns = [pattern for category in categories for pattern in BLOCK_PATTERNS[category]]
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+def setup_driver(profile='default'):
+    """Start a Chrome driver configured by a named profile"""
+    driver = webdriver.Chrome(options=build_options(profile))
+
+    blocked = DRIVER_PROFILES[profile].get('block')
+    if blocked:
+        set_blocked_resources(driver, blocked)
+    return driver
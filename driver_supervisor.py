@@ -0,0 +1,130 @@
+from selenium.common.exceptions import WebDriverException
+from driver_setup import setup_driver
+
+try:
+    import psutil
+except ImportError:
+    # Memory-based recycling is skipped without psutil (see requirements.txt); the supervisor warns about it
+    psutil = None
+
+# Recycle the browser after this many pages, however healthy it looks
+DEFAULT_MAX_PAGES = 500
+
+# Recycle once Chrome and all its child processes use more memory than this (MB)
+DEFAULT_MAX_RSS_MB = 2048
+
+# Recycle after this many failed pages in a row
+DEFAULT_MAX_ERRORS = 5
+
+# Pages between two memory checks
+RSS_CHECK_EVERY = 25
+
+# Attempts per listing or lookup when the browser dies under it
+MAX_ATTEMPTS = 2
+
+class DriverSupervisor:
+    """Own a browser, recycle it when it grows or fails, and retry work lost to a crash"""
+
+    def __init__(self, driver_factory=setup_driver, max_pages=DEFAULT_MAX_PAGES,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB, max_errors=DEFAULT_MAX_ERRORS, name='browser'):
+        self.driver_factory = driver_factory
+        self.limits = {'max_pages': max_pages, 'max_rss_mb': max_rss_mb, 'max_errors': max_errors}
+        self.name = name
+        if psutil is None and max_rss_mb:
+            print(f"Warning: psutil is not installed, so {name} cannot be recycled at {max_rss_mb} MB "
+                  f"(pip install psutil to enforce --max-browser-memory-mb)")
+        self.driver = driver_factory()
+        self.pages = 0
+        self.errors = 0
+        self.recycles = 0
+        self.retries = 0
+        self.peak_rss_mb = 0.0
+
+    def is_alive(self):
+        """True if the browser still answers WebDriver commands"""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def browser_rss_mb(self):
+        """Resident memory of chromedriver and every browser process under it, or None without psutil"""
+        if psutil is None:
+            return None
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except Exception:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def recycle(self, reason, driver_factory=None):
+        """Quit the browser and start a fresh one, optionally from a different factory"""
+        print(f"Recycling {self.name} after {self.pages} pages: {reason}")
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        if driver_factory is not None:
+            self.driver_factory = driver_factory
+        self.driver = self.driver_factory()
+        self.pages = 0
+        self.errors = 0
+        self.recycles += 1
+
+    def _check_health(self):
+        """Recycle the browser if it passed a page, memory or error threshold"""
+        if self.pages >= self.limits['max_pages']:
+            self.recycle(f"page limit {self.limits['max_pages']} reached")
+        elif self.errors >= self.limits['max_errors']:
+            self.recycle(f"{self.errors} failed pages in a row")
+        elif self.pages and self.pages % RSS_CHECK_EVERY == 0:
+            rss = self.browser_rss_mb()
+            if rss is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb, rss)
+                if rss > self.limits['max_rss_mb']:
+                    self.recycle(f"memory {rss:.0f} MB over {self.limits['max_rss_mb']} MB")
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn(driver, *args, **kwargs), retrying on a fresh browser if this one dies"""
+        result = None
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self._check_health()
+            try:
+                result = fn(self.driver, *args, **kwargs)
+            except WebDriverException as e:
+                print(f"WebDriver error in {self.name}: {str(e).splitlines()[0] if str(e) else e}")
+                result = None
+            self.pages += 1
+
+            if result:
+                self.errors = 0
+                return result
+            self.errors += 1
+
+            # The page functions swallow exceptions, so a failed result may hide a dead browser
+            if self.is_alive():
+                return result
+            if attempt < MAX_ATTEMPTS:
+                self.retries += 1
+            self.recycle("browser stopped responding")
+        return result
+
+    def quit(self):
+        """Quit the current browser"""
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+    def print_stats(self):
+        """Print how often the browser was recycled"""
+        peak = f", peak memory {self.peak_rss_mb:.0f} MB" if self.peak_rss_mb else ""
+        print(f"\n{self.name}: {self.recycles} recycles, {self.retries} retried pages{peak}")
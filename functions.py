@@ -5,7 +5,20 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
 import csv
 import os
-from xpaths import DETAIL_XPATHS, GBP_XPATHS, EXTRA_FIELDS_XPATH, STANDARD_FIELDS
+from xpaths import DETAIL_XPATHS, GBP_XPATHS, EXTRA_FIELDS_XPATH, STANDARD_FIELDS, GOOGLE_URL
+from parsers import parse_listing_html
+from csv_writer import CsvBatchWriter, CSV_FIELDNAMES
+from gbp_script import extract_gbp_with_script
+from gbp_match import match_confidence, DEFAULT_MIN_CONFIDENCE
+from review_harvest import harvest_reviews, DEFAULT_MAX_REVIEWS, EXPAND_TIMEOUT
+from rate_limiter import SCHEDULER, is_block_page
+from snapshot_archive import archive_page, is_archiving, KIND_LISTING, KIND_GBP
+from metrics import (
+    METRICS, STAGE_LISTING_DETAIL, STAGE_GBP_LOOKUP, STAGE_GOOGLE_SEARCH, STAGE_REVIEW_EXPANSION, STAGE_IMAGE_MODAL
+)
+from waits import (
+    wait_for_document_ready, wait_for_element, wait_for_page_change, wait_for_image_src, wait_for_staleness
+)
 
 def get_listing_urls(driver, xpath):
     """Extract all listing URLs from the current page"""
@@ -41,12 +54,13 @@ def click_next_page(driver, next_page_xpath):
             EC.presence_of_element_located((By.XPATH, next_page_xpath))
         )
         
-        # Click using JavaScript
+        # Click using JavaScript, at the pace allowed for the directory
+        SCHEDULER.acquire(driver.current_url)
         driver.execute_script("arguments[0].click();", next_button)
         
-        # Wait for page to load
-        time.sleep(2)
-        return True
+        # Wait for the pager to be replaced and the new page to load
+        wait_for_page_change(driver, next_button, label='next_page')
+        return check_for_block(driver, driver.current_url)
     except TimeoutException:
         print("No more pages available")
         return False
@@ -54,12 +68,23 @@ def click_next_page(driver, next_page_xpath):
         print(f"Error clicking next page: {str(e)}")
         return False
 
-def get_element_text(driver, xpath):
-    """Safely get text from an element"""
+def find_element_timed(driver, xpath, timeout):
+    """Wait for an element, recording the lookup's latency and whether it timed out"""
+    started = time.monotonic()
     try:
-        element = WebDriverWait(driver, 5).until(
+        element = WebDriverWait(driver, timeout).until(
             EC.presence_of_element_located((By.XPATH, xpath))
         )
+    except TimeoutException:
+        METRICS.record_lookup(xpath, time.monotonic() - started, False)
+        raise
+    METRICS.record_lookup(xpath, time.monotonic() - started, True)
+    return element
+
+def get_element_text(driver, xpath):
+    """Safely get text from an element"""
+    try:
+        element = find_element_timed(driver, xpath, 5)
         return element.text.strip()
     except:
         return ""
@@ -67,9 +92,7 @@ def get_element_text(driver, xpath):
 def get_element_href(driver, xpath):
     """Safely get href attribute from an element"""
     try:
-        element = WebDriverWait(driver, 2).until(
-            EC.presence_of_element_located((By.XPATH, xpath))
-        )
+        element = find_element_timed(driver, xpath, 2)
         return element.get_attribute('href')
     except:
         return ""
@@ -77,9 +100,7 @@ def get_element_href(driver, xpath):
 def get_element_src(driver, xpath):
     """Safely get src attribute from an element"""
     try:
-        element = WebDriverWait(driver, 2).until(
-            EC.presence_of_element_located((By.XPATH, xpath))
-        )
+        element = find_element_timed(driver, xpath, 2)
         return element.get_attribute('src')
     except:
         return ""
@@ -114,12 +135,30 @@ def get_extra_fields(driver):
     except:
         return {}
 
+def open_page(driver, url, record_success=True):
+    """Load a page at the pace allowed for its host; False if it turned out to be a block page"""
+    SCHEDULER.acquire(url)
+    driver.get(url)
+    return check_for_block(driver, url, record_success)
+
+def check_for_block(driver, url, record_success=True):
+    """Report the loaded page to the rate limiter; False if it is a captcha or consent page"""
+    if is_block_page(driver.current_url, driver.title):
+        SCHEDULER.record_block(url)
+        return False
+    if record_success:
+        SCHEDULER.record_success(url)
+    return True
+
+@METRICS.stage(STAGE_LISTING_DETAIL)
 def extract_listing_details(driver, url):
     """Extract all details from a listing page"""
     try:
         # Navigate to the URL
-        driver.get(url)
-        time.sleep(2)  # Wait for page load
+        if not open_page(driver, url):
+            print(f"Blocked while loading {url}")
+            return None
+        wait_for_document_ready(driver, label='listing_page')
         
         # Initialize data dictionary
         data = {'url': url}
@@ -146,11 +185,39 @@ def extract_listing_details(driver, url):
         extra_fields = get_extra_fields(driver)
         data['extra_fields'] = extra_fields
         
+        # Keep the raw page so later selector fixes can be re-run offline
+        if is_archiving():
+            archive_page(KIND_LISTING, url, driver.page_source, url)
+        
         return data
     except Exception as e:
         print(f"Error extracting details from {url}: {str(e)}")
         return None
 
+@METRICS.stage(STAGE_LISTING_DETAIL)
+def extract_listing_details_from_source(driver, url):
+    """Extract all details from a listing page with one page_source round-trip"""
+    try:
+        # Navigate to the URL
+        if not open_page(driver, url):
+            print(f"Blocked while loading {url}")
+            return None
+        wait_for_element(driver, DETAIL_XPATHS['title'], label='listing_title')
+
+        # Evaluate every XPath locally, so missing fields cost nothing
+        page_source = driver.page_source
+        archive_page(KIND_LISTING, url, page_source, url)
+        return parse_listing_html(page_source, url)
+    except Exception as e:
+        print(f"Error extracting details from {url}: {str(e)}")
+        return None
+
+# GBP extraction tiers, from cheapest to most expensive
+TIER_PANEL = 'panel'
+TIER_REVIEWS = 'reviews'
+TIER_FULL = 'full'
+GBP_TIERS = (TIER_PANEL, TIER_REVIEWS, TIER_FULL)
+
 def extract_cid_from_href(href):
     """Extract CID from Google Business Profile href"""
     try:
@@ -168,118 +235,205 @@ def create_maps_url(cid):
         return f"https://maps.google.com/?cid={cid}"
     return ""
 
-def get_google_reviews(driver, title, address):
-    """Get reviews and GBP details from Google Business Profile"""
+@METRICS.stage(STAGE_GOOGLE_SEARCH)
+def search_google(driver, title, address, google_url=GOOGLE_URL):
+    """Search Google for a business and wait for the results page"""
+    # Navigate to Google; only the results page counts as the search's healthy response
+    if not open_page(driver, google_url, record_success=False):
+        raise Exception("Google returned a captcha or consent page")
+    
+    # Search for the business
+    search_query = f"{title} {address}"
+    search_box = WebDriverWait(driver, 5).until(
+        EC.presence_of_element_located((By.NAME, "q"))
+    )
+    search_box.send_keys(search_query)
+    search_box.submit()
+    wait_for_element(driver, GBP_XPATHS['search_results'], label='google_results')
+    if not check_for_block(driver, google_url):
+        raise Exception("Google returned a captcha instead of search results")
+
+def extract_gbp_panel(driver):
+    """Extract knowledge panel details one WebDriver call per field"""
+    gbp_data = {}
+    
+    # Extract GBP details
     try:
-        # Navigate to Google
-        driver.get("https://www.google.com")
-        time.sleep(2)
+        gbp_data['gbp_title'] = get_element_text(driver, GBP_XPATHS['gbp_title'])
+    except:
+        gbp_data['gbp_title'] = ""
         
-        # Search for the business
-        search_query = f"{title} {address}"
-        search_box = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.NAME, "q"))
-        )
-        search_box.send_keys(search_query)
-        search_box.submit()
-        time.sleep(3)
+    try:
+        gbp_data['gbp_address'] = get_element_text(driver, GBP_XPATHS['gbp_address'])
+    except:
+        gbp_data['gbp_address'] = ""
         
-        # Initialize GBP data dictionary
-        gbp_data = {}
+    try:
+        gbp_data['gbp_phone'] = get_element_text(driver, GBP_XPATHS['gbp_phone'])
+    except:
+        gbp_data['gbp_phone'] = ""
         
-        # Extract GBP details
-        try:
-            gbp_data['gbp_title'] = get_element_text(driver, GBP_XPATHS['gbp_title'])
-        except:
-            gbp_data['gbp_title'] = ""
-            
-        try:
-            gbp_data['gbp_address'] = get_element_text(driver, GBP_XPATHS['gbp_address'])
-        except:
-            gbp_data['gbp_address'] = ""
-            
-        try:
-            gbp_data['gbp_phone'] = get_element_text(driver, GBP_XPATHS['gbp_phone'])
-        except:
-            gbp_data['gbp_phone'] = ""
-            
-        try:
-            gbp_data['gbp_website'] = get_element_href(driver, GBP_XPATHS['gbp_website'])
-        except:
-            gbp_data['gbp_website'] = ""
-            
-        try:
-            gbp_data['gbp_image'] = get_element_src(driver, GBP_XPATHS['gbp_image'])
-        except:
-            gbp_data['gbp_image'] = ""
+    try:
+        gbp_data['gbp_website'] = get_element_href(driver, GBP_XPATHS['gbp_website'])
+    except:
+        gbp_data['gbp_website'] = ""
+        
+    try:
+        gbp_data['gbp_image'] = get_element_src(driver, GBP_XPATHS['gbp_image'])
+    except:
+        gbp_data['gbp_image'] = ""
 
-        try:
-            gbp_data['gbp_map_image'] = get_element_src(driver, GBP_XPATHS['gbp_map_image'])
-        except:
-            gbp_data['gbp_map_image'] = ""
+    try:
+        gbp_data['gbp_map_image'] = get_element_src(driver, GBP_XPATHS['gbp_map_image'])
+    except:
+        gbp_data['gbp_map_image'] = ""
 
-        try:
-            gbp_data['gbp_outside_image'] = get_element_src(driver, GBP_XPATHS['gbp_outside_image'])
-        except:
-            gbp_data['gbp_outside_image'] = ""
+    try:
+        gbp_data['gbp_outside_image'] = get_element_src(driver, GBP_XPATHS['gbp_outside_image'])
+    except:
+        gbp_data['gbp_outside_image'] = ""
 
-        # Extract CID and create Maps URL
-        try:
-            cid_href = get_element_href(driver, GBP_XPATHS['gbp_cid_link'])
-            cid = extract_cid_from_href(cid_href)
-            gbp_data['gbp_maps_url'] = create_maps_url(cid)
-        except:
-            gbp_data['gbp_maps_url'] = ""
-        
-        # Click on Reviews button if present
-        try:
-            reviews_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, GBP_XPATHS['reviews_button']))
-            )
-            driver.execute_script("arguments[0].click();", reviews_button)
-            time.sleep(2)
-        except:
-            print("No reviews button found")
-            return [], gbp_data
+    # Extract CID and create Maps URL
+    try:
+        cid_href = get_element_href(driver, GBP_XPATHS['gbp_cid_link'])
+        cid = extract_cid_from_href(cid_href)
+        gbp_data['gbp_maps_url'] = create_maps_url(cid)
+    except:
+        gbp_data['gbp_maps_url'] = ""
+    
+    return gbp_data
+
+def extract_gbp_reviews(driver):
+    """Open the reviews pane and get up to 5 reviews and ratings, or None without a Reviews button"""
+    # Click on Reviews button if present
+    try:
+        reviews_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, GBP_XPATHS['reviews_button']))
+        )
+        driver.execute_script("arguments[0].click();", reviews_button)
+    except:
+        print("No reviews button found")
+        return None
+    
+    # Get reviews
+    reviews = []
+    try:
+        wait_for_element(driver, GBP_XPATHS['review_text'], label='reviews_pane')
+        review_elements = driver.find_elements(By.XPATH, GBP_XPATHS['review_text'])
         
-        # Get reviews
-        reviews = []
-        try:
-            review_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.XPATH, GBP_XPATHS['review_text']))
-            )
-            
-            for element in review_elements[:5]:  # Get up to 5 reviews
-                # Check for 'More' link and click if present
-                try:
-                    more_link = element.find_element(By.XPATH, ".//a[text()='More']")
+        for element in review_elements[:5]:  # Get up to 5 reviews
+            # Check for 'More' link and click if present
+            try:
+                more_link = element.find_element(By.XPATH, GBP_XPATHS['review_more_link'])
+                with METRICS.stage(STAGE_REVIEW_EXPANSION):
                     driver.execute_script("arguments[0].click();", more_link)
-                    time.sleep(1)
-                except NoSuchElementException:
-                    pass
+                    # The link is replaced by the full text once the review expands
+                    wait_for_staleness(driver, more_link, EXPAND_TIMEOUT, label='review_expand')
+            except NoSuchElementException:
+                pass
 
-                # Extract review text
-                reviews.append(element.text.strip())
-                
-        except:
-            print("No reviews found")
+            # Extract review text
+            reviews.append(element.text.strip())
+            
+    except:
+        print("No reviews found")
 
-        # Get ratings
-        ratings = []
-        try:
-            rating_elements = driver.find_elements(By.XPATH, ".//div[contains(@aria-label, 'Rated')]")
-            for element in rating_elements[:5]:  # Get up to 5 ratings
-                rating_text = element.get_attribute('aria-label')
-                rating_value = rating_text.split(' ')[1]  # Extract the rating value
-                ratings.append(rating_value)
-        except:
-            print("No ratings found")
+    # Get ratings
+    ratings = []
+    try:
+        rating_elements = driver.find_elements(By.XPATH, GBP_XPATHS['review_rating'])
+        for element in rating_elements[:5]:  # Get up to 5 ratings
+            rating_text = element.get_attribute('aria-label')
+            rating_value = rating_text.split(' ')[1]  # Extract the rating value
+            ratings.append(rating_value)
+    except:
+        print("No ratings found")
+    
+    return reviews, ratings
+
+def extract_gbp_in_one_call(driver, include_reviews=True):
+    """Extract the knowledge panel (and reviews and ratings) with one injected script"""
+    result = extract_gbp_with_script(driver, include_reviews=include_reviews)
+    
+    gbp_data = {
+        field: result.get(field) or ""
+        for field in ('gbp_title', 'gbp_address', 'gbp_phone', 'gbp_website',
+                      'gbp_image', 'gbp_map_image', 'gbp_outside_image')
+    }
+    gbp_data['gbp_maps_url'] = create_maps_url(extract_cid_from_href(result.get('gbp_cid_link') or ""))
+    
+    if not result.get('reviews_button'):
+        print("No reviews button found")
+        return gbp_data, None
+    if not include_reviews:
+        return gbp_data, ([], [])
+    return gbp_data, (result.get('reviews') or [], result.get('ratings') or [])
+
+def choose_gbp_tier(tier, listing, gbp_data, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """Downgrade to the panel-only tier when the panel does not confidently match the listing"""
+    if tier == TIER_PANEL or listing is None:
+        return tier
+    confidence = match_confidence(listing, gbp_data)
+    if confidence < min_confidence:
+        print(f"Low match confidence ({confidence:.2f}), skipping reviews and images")
+        return TIER_PANEL
+    print(f"Match confidence {confidence:.2f}")
+    return tier
+
+def archive_gbp_page(driver, title, address, listing=None):
+    """Archive the Google results page in its current state; the latest snapshot of a listing wins offline"""
+    if is_archiving():
+        # Keyed by listing URL, so offline re-extraction still finds it if the title parses differently
+        archive_page(KIND_GBP, listing['url'] if listing else f"{title} {address}", driver.page_source,
+                     driver.current_url, query=f"{title} {address}")
+
+@METRICS.stage(STAGE_GBP_LOOKUP)
+def get_google_reviews(driver, title, address, extractor='webdriver', tier=TIER_FULL, listing=None,
+                       min_confidence=DEFAULT_MIN_CONFIDENCE, review_sink=None, max_reviews=DEFAULT_MAX_REVIEWS,
+                       google_url=GOOGLE_URL):
+    """Get reviews and GBP details from Google Business Profile"""
+    try:
+        search_google(driver, title, address, google_url)
+        archive_gbp_page(driver, title, address, listing)
+        
+        # 'script' reads the whole panel in one round-trip, 'webdriver' one field per call;
+        # either way the reviews pane is only opened for a matching panel
+        if extractor == 'script':
+            gbp_data, _ = extract_gbp_in_one_call(driver, include_reviews=False)
+        else:
+            gbp_data = extract_gbp_panel(driver)
+        
+        # The costly tiers only run when the panel matches the directory listing
+        tier = choose_gbp_tier(tier, listing, gbp_data, min_confidence)
+        if tier == TIER_PANEL:
+            return [], gbp_data
+        
+        if extractor == 'script':
+            _, review_result = extract_gbp_in_one_call(driver, include_reviews=True)
+        else:
+            review_result = extract_gbp_reviews(driver)
+        
+        if review_result is None:
+            return [], gbp_data
+        reviews, ratings = review_result
+        
+        # Stream every review, beyond the first five, while the pane is open
+        if review_sink is not None:
+            try:
+                harvest_reviews(driver, review_sink, max_reviews)
+            except Exception as e:
+                print(f"Error harvesting reviews: {str(e)}")
         
         # Add reviews and ratings to gbp_data
         for i in range(5):
             gbp_data[f'review_{i+1}'] = reviews[i] if i < len(reviews) else ""
             gbp_data[f'review_rating_{i+1}'] = ratings[i] if i < len(ratings) else ""
         
+        if tier != TIER_FULL:
+            # Archive again with the reviews pane open, so offline re-extraction sees the reviews
+            archive_gbp_page(driver, title, address, listing)
+            return reviews, gbp_data
+        
         # Extract embedded images
         try:
             image_sources = extract_embedded_images(driver)
@@ -291,6 +445,8 @@ def get_google_reviews(driver, title, address):
             gbp_data['gbp_embedded_url_2'] = ""
             gbp_data['gbp_embedded_url_3'] = ""
         
+        # Archive again with the reviews pane and photo gallery open
+        archive_gbp_page(driver, title, address, listing)
         return reviews, gbp_data
     except Exception as e:
         print(f"Error getting Google reviews: {str(e)}")
@@ -308,77 +464,113 @@ def read_csv_data(filename='restoration_listings.csv'):
         print(f"Error reading CSV: {str(e)}")
     return data
 
-def save_to_csv(data, filename='restoration_listings.csv'):
-    """Save or append data to CSV file"""
-    file_exists = os.path.isfile(filename)
-    
-    # Define fieldnames
-    fieldnames = [
-        'url', 'title', 'phone', 'email', 'organization',
-        'address_line1', 'address_line2', 'locality',
-        'administrative_area', 'postal_code', 'country',
-        'full_address', 'about', 'contact', 'description', 'website',
-        'gbp_title', 'gbp_address', 'gbp_phone', 'gbp_website', 
-        'gbp_image', 'gbp_map_image', 'gbp_outside_image',
-        'gbp_maps_url', 'extra_fields',
-        'review_1', 'review_2', 'review_3', 'review_4', 'review_5',
-        'review_rating_1', 'review_rating_2', 'review_rating_3', 'review_rating_4', 'review_rating_5',
-        'gbp_embedded_url_1', 'gbp_embedded_url_2', 'gbp_embedded_url_3'
-    ]
-    
+def write_csv(rows, filename, fieldnames=CSV_FIELDNAMES):
+    """Atomically replace a CSV file with the given rows (any iterable) and return how many were written"""
+    temp_filename = f"{filename}.tmp"
+    written = 0
     try:
-        with open(filename, 'a', newline='', encoding='utf-8') as csvfile:
+        with open(temp_filename, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            # Write header if file doesn't exist
-            if not file_exists:
-                writer.writeheader()
-            
-            # Convert extra_fields dictionary to string if it exists
-            if 'extra_fields' in data and isinstance(data['extra_fields'], dict):
-                data['extra_fields'] = str(data['extra_fields'])
-            
-            # Write data
-            writer.writerow(data)
-            
+            writer.writeheader()
+            for row in rows:
+                # Flatten extra_fields on a copy, leaving the caller's rows intact
+                if isinstance(row.get('extra_fields'), dict):
+                    row = dict(row, extra_fields=str(row['extra_fields']))
+                writer.writerow(row)
+                written += 1
+        os.replace(temp_filename, filename)
     except Exception as e:
-        print(f"Error saving to CSV: {str(e)}")
+        print(f"Error writing CSV: {str(e)}")
+    return written
 
-def update_csv_with_reviews(driver, filename='restoration_listings.csv'):
-    """Update CSV file with Google reviews"""
-    # Read existing data
-    data = read_csv_data(filename)
+def add_google_data_to_row(driver, row, cache=None, review_store=None, review_writer=None, **lookup_options):
+    """Look up a listing row on Google and add its GBP data and reviews; True if the lookup succeeded"""
+    print(f"\nProcessing reviews for: {row['title']}")
+    
+    # Results of different tiers hold different fields, so cache them separately
+    variant = lookup_options.get('tier', TIER_FULL)
+    
+    # Full review harvesting stores every review keyed by listing URL and index,
+    # so a retried or resumed lookup replaces its reviews instead of repeating them;
+    # the review writer also appends each one to the reviews file as it is harvested
+    if review_store is not None:
+        review_store.clear_reviews(row['url'])
+        def review_sink(index, text, rating):
+            review_store.save_review(row['url'], index, text, rating)
+            if review_writer is not None:
+                review_writer.writerow(
+                    {'listing_url': row['url'], 'review_index': index, 'rating': rating, 'text': text}
+                )
+        lookup_options['review_sink'] = review_sink
+    
+    # Reuse a fresh cached result when we have one (not when harvesting, the cache holds no full reviews)
+    use_cache = cache is not None and review_store is None
+    cached = cache.get(row['title'], row['full_address'], variant) if use_cache else None
+    if cached is not None:
+        print("Using cached GBP result")
+        reviews, gbp_data = cached
+    else:
+        # Get reviews and GBP data
+        reviews, gbp_data = get_google_reviews(
+            driver, row['title'], row['full_address'], listing=row, **lookup_options
+        )
+        if cache is not None and gbp_data:
+            cache.put(row['title'], row['full_address'], reviews, gbp_data, variant)
+    print(reviews)
+    print(gbp_data)
+    print("__________________________________________________________________")
+    
+    # Add GBP data to the row
+    row.update(gbp_data)
+    
+    # Add reviews to the row data
+    for i, review in enumerate(reviews, 1):
+        row[f'review_{i}'] = review
+    
+    # Fill empty review slots
+    for i in range(len(reviews) + 1, 6):
+        row[f'review_{i}'] = ""
+    
+    return bool(gbp_data)
+
+def update_csv_with_reviews(supervisor, filename='restoration_listings.csv', state=None, cache=None, sink=None,
+                            **lookup_options):
+    """Update CSV file with Google reviews, looking each row up on the supervised browser"""
+    # Read existing data, from the crawl state when there is one so extra_fields stays a dict
+    data = state.get_listings() if state is not None else read_csv_data(filename)
     
     # Create a new file for the updated data
     new_filename = 'restoration_listings_with_reviews.csv'
     
     # Process each row
-    for row in data:
-        print(f"\nProcessing reviews for: {row['title']}")
-        
-        # Get reviews and GBP data
-        reviews, gbp_data = get_google_reviews(driver, row['title'], row['full_address'])
-        print(reviews)
-        print(gbp_data)
-        print("__________________________________________________________________")
-        
-        # Add GBP data to the row
-        row.update(gbp_data)
-        
-        # Add reviews to the row data
-        for i, review in enumerate(reviews, 1):
-            row[f'review_{i}'] = review
-        
-        # Fill empty review slots
-        for i in range(len(reviews) + 1, 6):
-            row[f'review_{i}'] = ""
-        
-        # Save to new CSV
-        save_to_csv(row, new_filename)
-        
-        # Add delay between requests
-        time.sleep(2)
+    with CsvBatchWriter(new_filename) as writer:
+        for row in data:
+            process_gbp_row(supervisor, row, writer, state, cache, sink, **lookup_options)
+
+def process_gbp_row(supervisor, row, writer, state=None, cache=None, sink=None, **lookup_options):
+    """Look a listing row up on Google and save it everywhere; False if an earlier run already did"""
+    # Skip lookups already completed by an earlier (interrupted) run, replaying the stored row to the sink
+    if state is not None and state.is_gbp_done(row['url']):
+        stored_row = state.get_gbp_result(row['url']) if sink is not None else None
+        if stored_row is not None:
+            sink.writerow(stored_row)
+        return False
+
+    found = False
+    try:
+        found = supervisor.run(add_google_data_to_row, row, cache, **lookup_options)
+    except Exception as e:
+        print(f"Error getting Google data for {row.get('url')}: {str(e)}")
+
+    # Stream to the structured output and the reviews CSV straight away
+    if sink is not None:
+        sink.writerow(row)
+    writer.writerow(row)
+    if state is not None and found:
+        state.save_gbp_result(row['url'], row)
+    return True
 
+@METRICS.stage(STAGE_IMAGE_MODAL)
 def extract_embedded_images(driver):
     """Extract sources of the first embedded image normally and use a different XPath for the second and third images"""
     try:
@@ -386,8 +578,8 @@ def extract_embedded_images(driver):
         gbp_image = driver.find_element(By.XPATH, GBP_XPATHS['gbp_image'])
         driver.execute_script("arguments[0].click();", gbp_image)
         
-        # Wait for the modal to load
-        time.sleep(6)
+        # Wait for the modal gallery to render
+        wait_for_element(driver, GBP_XPATHS['embedded_images'], label='image_modal')
 
         # Find all embedded images
         embedded_images = driver.find_elements(By.XPATH, GBP_XPATHS['embedded_images'])
@@ -398,12 +590,12 @@ def extract_embedded_images(driver):
         # Get the first embedded image normally
         if embedded_images:
             driver.execute_script("arguments[0].click();", embedded_images[0])
-            time.sleep(2)
-            large_image = driver.find_element(By.XPATH, GBP_XPATHS['large_image'])
-            image_sources.append(large_image.get_attribute('src'))
+            large_image = wait_for_image_src(driver, GBP_XPATHS['large_image'], label='large_image')
+            if large_image:
+                image_sources.append(large_image.get_attribute('src'))
 
         # Use a different XPath for the second and third images
-        additional_images = driver.find_elements(By.XPATH, "//img[@data-ils=3 and @jsaction='rcuQ6b:trigger.M8vzZb']")
+        additional_images = driver.find_elements(By.XPATH, GBP_XPATHS['additional_images'])
         for img in additional_images[:2]:
             image_sources.append(img.get_attribute('src'))
 
@@ -0,0 +1,110 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from dedupe import normalize_address
+
+# Default location of the GBP lookup cache
+DEFAULT_CACHE_DB = 'gbp_cache.db'
+
+# Entries older than this are looked up on Google again (seconds)
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Least recently used entries are evicted beyond this many entries
+DEFAULT_MAX_ENTRIES = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gbp_cache (
+    query_key TEXT PRIMARY KEY,
+    reviews TEXT NOT NULL,
+    gbp_data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS gbp_cache_last_access ON gbp_cache (last_access);
+"""
+
+def make_cache_key(title, address, variant=''):
+    """Normalized title + full_address query (plus extraction variant) used as the cache key"""
+    normalized_title = ' '.join(re.sub(r'[^a-z0-9 ]', ' ', (title or '').lower()).split())
+    key = f"{normalized_title}|{normalize_address(address)}"
+    return f"{key}|{variant}" if variant else key
+
+class GbpCache:
+    """Persistent GBP lookup cache with a TTL and size-bounded LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_DB, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def get(self, title, address, variant=''):
+        """Return cached (reviews, gbp_data) for a business, or None on a miss or stale entry"""
+        key = make_cache_key(title, address, variant)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT reviews, gbp_data, created_at FROM gbp_cache WHERE query_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row[2] > self.ttl:
+                self.expired += 1
+                self.misses += 1
+                self._conn.execute("DELETE FROM gbp_cache WHERE query_key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE gbp_cache SET last_access = ? WHERE query_key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, title, address, reviews, gbp_data, variant=''):
+        """Store a GBP lookup result and evict least recently used entries over the limit"""
+        key = make_cache_key(title, address, variant)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gbp_cache (query_key, reviews, gbp_data, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(reviews), json.dumps(gbp_data), now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM gbp_cache").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM gbp_cache WHERE query_key IN "
+                    "(SELECT query_key FROM gbp_cache ORDER BY last_access LIMIT ?)", (excess,)
+                )
+                self.evicted += excess
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self):
+        """Hit/miss counters for this run"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def print_stats(self):
+        """Print cache effectiveness for this run"""
+        stats = self.get_stats()
+        print(f"\nGBP cache ({self.path}): {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['expired']} stale), {stats['evicted']} evicted, hit rate {stats['hit_rate']:.0%}")
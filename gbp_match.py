@@ -0,0 +1,49 @@
+import re
+from difflib import SequenceMatcher
+from dedupe import normalize_phone, normalize_address
+
+# Minimum confidence for running the expensive extraction tiers
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# Relative weight of each signal in the confidence score
+MATCH_WEIGHTS = {
+    'title': 0.4,
+    'phone': 0.35,
+    'address': 0.25
+}
+
+# Words that say nothing about which business a title refers to
+TITLE_STOPWORDS = {'inc', 'llc', 'co', 'corp', 'company', 'the', 'and', 'of', 'ltd'}
+
+def normalize_title(title):
+    """Lowercase a business name and drop punctuation and legal suffixes"""
+    words = re.sub(r'[^a-z0-9 ]', ' ', (title or '').lower()).split()
+    return ' '.join(word for word in words if word not in TITLE_STOPWORDS)
+
+def similarity(a, b):
+    """Fuzzy similarity between two normalized strings, from 0 to 1"""
+    if not a or not b:
+        return None
+    if a == b or a in b or b in a:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+def match_confidence(listing, gbp_data):
+    """Score how likely the knowledge panel belongs to the directory listing, from 0 to 1"""
+    scores = {
+        'title': similarity(normalize_title(listing.get('title')), normalize_title(gbp_data.get('gbp_title'))),
+        'address': similarity(
+            normalize_address(listing.get('full_address')), normalize_address(gbp_data.get('gbp_address'))
+        )
+    }
+
+    listing_phone = normalize_phone(listing.get('phone'))
+    gbp_phone = normalize_phone(gbp_data.get('gbp_phone'))
+    scores['phone'] = float(listing_phone == gbp_phone) if listing_phone and gbp_phone else None
+
+    # Only weigh the signals present on both sides
+    available = {signal: score for signal, score in scores.items() if score is not None}
+    if not available:
+        return 0.0
+    total_weight = sum(MATCH_WEIGHTS[signal] for signal in available)
+    return sum(MATCH_WEIGHTS[signal] * score for signal, score in available.items()) / total_weight
@@ -0,0 +1,109 @@
+from xpaths import GBP_XPATHS
+
+# Number of reviews (and ratings) returned, matching the review_1..5 columns
+DEFAULT_MAX_REVIEWS = 5
+
+# Milliseconds the script waits for the reviews pane and "More" expansions
+DEFAULT_TIMEOUT_MS = 10000
+
+# Runs inside the page with execute_async_script: reads the knowledge panel,
+# opens the reviews pane, expands every "More" link and returns everything at once.
+GBP_EXTRACT_SCRIPT = """
+var xpaths = arguments[0];
+var maxReviews = arguments[1];
+var timeoutMs = arguments[2];
+var includeReviews = arguments[3];
+var done = arguments[arguments.length - 1];
+
+function all(xpath, context) {
+    var snapshot = document.evaluate(
+        xpath, context || document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    var nodes = [];
+    for (var i = 0; i < snapshot.snapshotLength; i++) {
+        nodes.push(snapshot.snapshotItem(i));
+    }
+    return nodes;
+}
+function first(xpath) {
+    var nodes = all(xpath);
+    return nodes.length ? nodes[0] : null;
+}
+function text(node) {
+    return node ? (node.innerText || node.textContent || '').trim() : '';
+}
+function attr(node, name) {
+    // Properties give resolved absolute URLs, like WebDriver's get_attribute
+    return node ? (node[name] || node.getAttribute(name) || '') : '';
+}
+
+var result = {
+    gbp_title: text(first(xpaths.gbp_title)),
+    gbp_address: text(first(xpaths.gbp_address)),
+    gbp_phone: text(first(xpaths.gbp_phone)),
+    gbp_website: attr(first(xpaths.gbp_website), 'href'),
+    gbp_image: attr(first(xpaths.gbp_image), 'src'),
+    gbp_map_image: attr(first(xpaths.gbp_map_image), 'src'),
+    gbp_outside_image: attr(first(xpaths.gbp_outside_image), 'src'),
+    gbp_cid_link: attr(first(xpaths.gbp_cid_link), 'href'),
+    reviews_button: false,
+    reviews: [],
+    ratings: []
+};
+
+var button = first(xpaths.reviews_button);
+result.reviews_button = !!button;
+if (!button || !includeReviews) {
+    done(result);
+    return;
+}
+button.click();
+
+var started = Date.now();
+function timedOut() {
+    return Date.now() - started > timeoutMs;
+}
+function moreLinks(reviews) {
+    var links = [];
+    reviews.forEach(function (review) {
+        links = links.concat(all(xpaths.review_more_link, review));
+    });
+    return links;
+}
+function collect(reviews) {
+    result.reviews = reviews.map(text);
+    result.ratings = all(xpaths.review_rating).slice(0, maxReviews).map(function (node) {
+        var label = node.getAttribute('aria-label') || '';
+        return label.split(' ')[1] || '';
+    });
+    done(result);
+}
+function waitForExpansion(reviews) {
+    if (moreLinks(reviews).length && !timedOut()) {
+        setTimeout(function () { waitForExpansion(reviews); }, 50);
+        return;
+    }
+    collect(reviews);
+}
+function waitForReviews() {
+    var reviews = all(xpaths.review_text).slice(0, maxReviews);
+    if (!reviews.length) {
+        if (timedOut()) {
+            done(result);
+            return;
+        }
+        setTimeout(waitForReviews, 100);
+        return;
+    }
+    moreLinks(reviews).forEach(function (link) { link.click(); });
+    waitForExpansion(reviews);
+}
+waitForReviews();
+"""
+
+def extract_gbp_with_script(driver, max_reviews=DEFAULT_MAX_REVIEWS, timeout_ms=DEFAULT_TIMEOUT_MS,
+                            include_reviews=True):
+    """Extract the knowledge panel (and optionally reviews and ratings) in a single injected script call"""
+    # Leave the script a little longer than its own internal timeout
+    driver.set_script_timeout(timeout_ms / 1000 + 5)
+    return driver.execute_async_script(GBP_EXTRACT_SCRIPT, GBP_XPATHS, max_reviews, timeout_ms, include_reviews)
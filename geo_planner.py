@@ -0,0 +1,178 @@
+import math
+from urllib.parse import urlencode
+from xpaths import BASE_URL
+
+# Local centroid table: code -> (name, centroid lat, centroid lon, (south, west, north, east))
+# Bounding boxes are approximate and only used to sample points to cover.
+STATES = {
+    'AL': ('Alabama', 32.80, -86.79, (30.22, -88.47, 35.01, -84.89)),
+    'AK': ('Alaska', 64.20, -152.00, (51.20, -179.10, 71.40, -129.90)),
+    'AZ': ('Arizona', 34.17, -111.93, (31.33, -114.82, 37.00, -109.05)),
+    'AR': ('Arkansas', 34.90, -92.44, (33.00, -94.62, 36.50, -89.64)),
+    'CA': ('California', 37.18, -119.47, (32.53, -124.41, 42.01, -114.13)),
+    'CO': ('Colorado', 38.99, -105.55, (36.99, -109.06, 41.00, -102.04)),
+    'CT': ('Connecticut', 41.62, -72.73, (40.98, -73.73, 42.05, -71.79)),
+    'DE': ('Delaware', 38.99, -75.51, (38.45, -75.79, 39.84, -75.05)),
+    'DC': ('District of Columbia', 38.90, -77.03, (38.79, -77.12, 39.00, -76.91)),
+    'FL': ('Florida', 28.63, -82.45, (24.52, -87.63, 31.00, -80.03)),
+    'GA': ('Georgia', 32.64, -83.44, (30.36, -85.61, 35.00, -80.84)),
+    'HI': ('Hawaii', 20.29, -156.37, (18.91, -160.25, 22.24, -154.81)),
+    'ID': ('Idaho', 44.35, -114.61, (41.99, -117.24, 49.00, -111.04)),
+    'IL': ('Illinois', 40.04, -89.20, (36.97, -91.51, 42.51, -87.50)),
+    'IN': ('Indiana', 39.89, -86.28, (37.77, -88.10, 41.76, -84.78)),
+    'IA': ('Iowa', 42.08, -93.50, (40.38, -96.64, 43.50, -90.14)),
+    'KS': ('Kansas', 38.49, -98.38, (36.99, -102.05, 40.00, -94.59)),
+    'KY': ('Kentucky', 37.53, -85.30, (36.50, -89.57, 39.15, -81.96)),
+    'LA': ('Louisiana', 31.07, -91.99, (28.93, -94.04, 33.02, -88.82)),
+    'ME': ('Maine', 45.37, -69.24, (42.98, -71.08, 47.46, -66.95)),
+    'MD': ('Maryland', 39.06, -76.80, (37.91, -79.49, 39.72, -75.05)),
+    'MA': ('Massachusetts', 42.26, -71.81, (41.24, -73.51, 42.89, -69.93)),
+    'MI': ('Michigan', 44.35, -85.41, (41.70, -90.42, 48.31, -82.41)),
+    'MN': ('Minnesota', 46.28, -94.31, (43.50, -97.24, 49.38, -89.49)),
+    'MS': ('Mississippi', 32.74, -89.67, (30.17, -91.66, 35.00, -88.10)),
+    'MO': ('Missouri', 38.36, -92.46, (35.99, -95.77, 40.61, -89.10)),
+    'MT': ('Montana', 47.05, -109.63, (44.36, -116.05, 49.00, -104.04)),
+    'NE': ('Nebraska', 41.54, -99.80, (40.00, -104.05, 43.00, -95.31)),
+    'NV': ('Nevada', 39.33, -116.63, (35.00, -120.01, 42.00, -114.04)),
+    'NH': ('New Hampshire', 43.68, -71.58, (42.70, -72.56, 45.31, -70.61)),
+    'NJ': ('New Jersey', 40.19, -74.67, (38.93, -75.56, 41.36, -73.89)),
+    'NM': ('New Mexico', 34.41, -106.11, (31.33, -109.05, 37.00, -103.00)),
+    'NY': ('New York', 42.95, -75.53, (40.50, -79.76, 45.02, -71.86)),
+    'NC': ('North Carolina', 35.56, -79.39, (33.84, -84.32, 36.59, -75.46)),
+    'ND': ('North Dakota', 47.45, -100.47, (45.94, -104.05, 49.00, -96.55)),
+    'OH': ('Ohio', 40.29, -82.79, (38.40, -84.82, 41.98, -80.52)),
+    'OK': ('Oklahoma', 35.59, -97.49, (33.62, -103.00, 37.00, -94.43)),
+    'OR': ('Oregon', 43.93, -120.56, (41.99, -124.57, 46.29, -116.46)),
+    'PA': ('Pennsylvania', 40.88, -77.80, (39.72, -80.52, 42.27, -74.69)),
+    'RI': ('Rhode Island', 41.68, -71.56, (41.15, -71.91, 42.02, -71.12)),
+    'SC': ('South Carolina', 33.92, -80.90, (32.03, -83.35, 35.22, -78.54)),
+    'SD': ('South Dakota', 44.44, -100.23, (42.48, -104.06, 45.95, -96.44)),
+    'TN': ('Tennessee', 35.86, -86.35, (34.98, -90.31, 36.68, -81.65)),
+    'TX': ('Texas', 31.48, -99.33, (25.84, -106.65, 36.50, -93.51)),
+    'UT': ('Utah', 39.31, -111.67, (37.00, -114.05, 42.00, -109.04)),
+    'VT': ('Vermont', 44.07, -72.67, (42.73, -73.44, 45.02, -71.46)),
+    'VA': ('Virginia', 37.52, -78.85, (36.54, -83.68, 39.47, -75.24)),
+    'WA': ('Washington', 47.38, -120.45, (45.54, -124.85, 49.00, -116.92)),
+    'WV': ('West Virginia', 38.64, -80.62, (37.20, -82.64, 40.64, -77.72)),
+    'WI': ('Wisconsin', 44.62, -89.99, (42.49, -92.89, 47.31, -86.25)),
+    'WY': ('Wyoming', 43.00, -107.55, (40.99, -111.06, 45.01, -104.05))
+}
+
+# Search radii (miles) the planner may choose from
+RADIUS_OPTIONS = (50, 100, 150, 200, 300, 500, 1000)
+
+# Spacing (miles) of the sample grid laid over each target region
+GRID_SPACING_MILES = 20
+
+# Fixed cost of one directory query, relative to the pages of a REFERENCE_RADIUS search
+QUERY_COST = 1.0
+REFERENCE_RADIUS = 100
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = 69.0
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in miles"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+def resolve_state(value):
+    """Turn a state code or name into its two-letter code"""
+    code = value.strip().upper()
+    if code in STATES:
+        return code
+    for state_code, (name, _, _, _) in STATES.items():
+        if name.lower() == value.strip().lower():
+            return state_code
+    raise ValueError(f"Unknown state or region: {value}")
+
+def sample_points(state_code, spacing=GRID_SPACING_MILES):
+    """Lay a regular grid of (lat, lon) points over a state's bounding box"""
+    _, _, _, (south, west, north, east) = STATES[state_code]
+    lat_step = spacing / MILES_PER_DEGREE
+    points = []
+    lat = south + lat_step / 2
+    while lat < north:
+        lon_step = spacing / (MILES_PER_DEGREE * max(math.cos(math.radians(lat)), 0.1))
+        lon = west + lon_step / 2
+        while lon < east:
+            points.append((lat, lon))
+            lon += lon_step
+        lat += lat_step
+    return points
+
+def query_cost(radius):
+    """Relative cost of a query, growing with the number of result pages it returns"""
+    return QUERY_COST + (radius / REFERENCE_RADIUS) ** 2
+
+def plan_queries(regions, radius_options=RADIUS_OPTIONS, spacing=GRID_SPACING_MILES):
+    """Pick a small set of (origin state, radius) queries covering the regions (greedy weighted set cover)"""
+    targets = list(dict.fromkeys(resolve_state(region) for region in regions))
+    points = [point for code in targets for point in sample_points(code, spacing)]
+    max_radius = max(radius_options)
+
+    # Coverage of each candidate (origin, radius) as a set of point indices
+    candidates = {}
+    for code, (_, lat, lon, _) in STATES.items():
+        distances = [haversine_miles(lat, lon, p_lat, p_lon) for p_lat, p_lon in points]
+        if min(distances, default=math.inf) > max_radius:
+            continue
+        for radius in radius_options:
+            covered = frozenset(index for index, distance in enumerate(distances) if distance <= radius)
+            if covered:
+                candidates[(code, radius)] = covered
+
+    # Greedy: take the query with the most newly covered points per unit of added cost.
+    # Widening an origin already in the plan only costs the difference.
+    uncovered = set(range(len(points)))
+    chosen = {}
+    while uncovered:
+        best, best_score = None, 0
+        for (code, radius), covered in candidates.items():
+            current = chosen.get(code, 0)
+            if radius <= current:
+                continue
+            added_cost = query_cost(radius) - (query_cost(current) if current else 0)
+            score = len(covered & uncovered) / added_cost
+            if score > best_score:
+                best, best_score = (code, radius), score
+        if best is None:
+            break
+        chosen[best[0]] = best[1]
+        uncovered -= candidates[best]
+
+    if uncovered:
+        print(f"Warning: {len(uncovered)} of {len(points)} sample points are beyond every candidate radius")
+
+    # Drop the most expensive queries first if the others already cover their points
+    plan = list(chosen.items())
+    for query in sorted(plan, key=lambda query: -query[1]):
+        others = set().union(*(candidates[other] for other in plan if other != query))
+        if candidates[query] <= others:
+            plan.remove(query)
+
+    return plan
+
+def origin_address(state_code):
+    """Origin address string the directory geocodes for a state"""
+    return f"{STATES[state_code][0]} US, United States"
+
+def build_search_url(state_code, radius):
+    """Build a directory proximity search URL for an (origin, radius) query"""
+    query = urlencode([
+        ('combine', ''),
+        ('field_ams_geofield_proximity[value]', str(radius)),
+        ('field_ams_geofield_proximity[source_configuration][origin_address]', origin_address(state_code))
+    ])
+    return f"{BASE_URL}/directory-search?{query}"
+
+def plan_search_urls(regions, radius_options=RADIUS_OPTIONS):
+    """Plan the directory queries for the given regions and return their search URLs"""
+    plan = plan_queries(regions, radius_options)
+    print(f"Planned {len(plan)} directory queries for {len(regions)} regions:")
+    for code, radius in plan:
+        print(f"  {STATES[code][0]} within {radius} miles")
+    return [build_search_url(code, radius) for code, radius in plan]
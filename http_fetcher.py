@@ -0,0 +1,128 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from http_settings import HEADERS, REQUEST_TIMEOUT
+from parsers import parse_listing_html
+from rate_limiter import SCHEDULER, is_block_page
+from snapshot_archive import archive_page, KIND_LISTING
+from functions import extract_listing_details
+from metrics import METRICS, FAMILY_STAGE, STAGE_LISTING_DETAIL
+
+# Maximum number of listing pages fetched at the same time
+DEFAULT_CONCURRENCY = 8
+
+# Fields that must be present in the HTTP response, otherwise we fall back to Selenium
+REQUIRED_FIELDS = ('title',)
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(pool_size=DEFAULT_CONCURRENCY):
+    """Create a requests session with a keep-alive connection pool and retries"""
+    session = requests.Session()
+    # 429/503 are block signals left to the rate limiter's backoff, not retried blindly
+    retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+def get_session():
+    """Get the shared pooled session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+def fetch_response(url, session=None, headers=None):
+    """Fetch a page over plain HTTP at the host's allowed pace, returning the response or None on failure"""
+    session = session or get_session()
+    try:
+        SCHEDULER.acquire(url)
+        response = session.get(url, timeout=REQUEST_TIMEOUT, headers=headers)
+        if is_block_page(response.url, status_code=response.status_code):
+            SCHEDULER.record_block(url)
+        else:
+            SCHEDULER.record_success(url)
+        return response
+    except Exception as e:
+        print(f"Error fetching {url}: {str(e)}")
+        return None
+
+def fetch_html(url, session=None):
+    """Fetch a page over plain HTTP and return its HTML, or None on failure"""
+    response = fetch_response(url, session)
+    if response is None:
+        return None
+    if response.status_code != 200:
+        print(f"HTTP {response.status_code} for {url}")
+        return None
+    return response.text
+
+def has_expected_fields(data):
+    """Check that a parsed listing contains the fields we rely on"""
+    return bool(data) and all(data.get(field) for field in REQUIRED_FIELDS)
+
+def extract_listing_details_http(url, session=None, recrawl=None):
+    """Extract listing details without a browser, or None if the response is incomplete"""
+    if recrawl is None:
+        page_source = fetch_html(url, session)
+    else:
+        # Revalidate against the last fetch; a 304 means the stored listing is still current
+        response = fetch_response(url, session, recrawl.conditional_headers(url))
+        if response is not None and response.status_code == 304:
+            stored = recrawl.get_data(url)
+            if stored is not None:
+                return stored
+        if response is None or response.status_code != 200:
+            if response is not None:
+                print(f"HTTP {response.status_code} for {url}")
+            return None
+        recrawl.remember_validators(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        page_source = response.text
+    if not page_source:
+        return None
+    archive_page(KIND_LISTING, url, page_source, url)
+    try:
+        data = parse_listing_html(page_source, url)
+    except Exception as e:
+        print(f"Error parsing {url}: {str(e)}")
+        return None
+    return data if has_expected_fields(data) else None
+
+def _timed_listing_http(url, session, recrawl):
+    """Run the HTTP extraction and return (data, seconds taken)"""
+    started = time.monotonic()
+    data = extract_listing_details_http(url, session, recrawl)
+    return data, time.monotonic() - started
+
+def iter_listings_http(urls, max_workers=DEFAULT_CONCURRENCY, driver=None,
+                       fallback_fn=extract_listing_details, recrawl=None):
+    """Yield listings in input order as they arrive over pooled HTTP, falling back to Selenium"""
+    urls = list(urls)
+    session = create_session(pool_size=max_workers)
+    fetched = 0
+    fallbacks = 0
+
+    try:
+        # Bounded concurrency; map yields results in input order as they complete
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda url: _timed_listing_http(url, session, recrawl), urls)
+            for url, (data, seconds) in zip(urls, results):
+                if data is not None:
+                    fetched += 1
+                    METRICS.observe(FAMILY_STAGE, STAGE_LISTING_DETAIL, seconds)
+                elif driver is not None:
+                    # The HTTP response was missing expected fields; the Selenium
+                    # extractor's own listing_detail stage counts this listing once
+                    fallbacks += 1
+                    data = fallback_fn(driver, url)
+                yield data
+    finally:
+        session.close()
+        print(f"HTTP fetched {fetched}/{len(urls)} listings, {fallbacks} Selenium fallbacks")
@@ -0,0 +1,12 @@
+# Seconds to wait for a connection and for each read
+REQUEST_TIMEOUT = (5, 15)
+
+# Browser-like headers sent with every plain HTTP request
+HEADERS = {
+    'User-Agent': (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+    ),
+    'Accept': "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    'Accept-Language': "en-US,en;q=0.9"
+}
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+# Default folder holding the hash-named image files and their index
+DEFAULT_STORE_DIR = 'image_store'
+
+# Stored URLs younger than this are reused without any request (seconds)
+DEFAULT_REVALIDATE_AFTER = 7 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+class BlobWriter:
+    """Temporary file that hashes what is written to it, committed into the store afterwards"""
+
+    def __init__(self, temp_path):
+        self.temp_path = temp_path
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(temp_path, 'wb')
+
+    def write(self, chunk):
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        """Drop a partial download"""
+        self.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+class ImageStore:
+    """Content-addressed image files with a URL -> hash index and HTTP validators for re-fetching"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR, revalidate_after=DEFAULT_REVALIDATE_AFTER):
+        self.root = root
+        self.revalidate_after = revalidate_after
+        self.reused = 0
+        self.revalidated = 0
+        self.downloaded = 0
+        self.deduplicated = 0
+        os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def lookup(self, url):
+        """Stored entry for a URL as a dict, or None if it was never stored (or its file is gone)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT images.sha256, etag, last_modified, checked_at, path FROM images "
+                "JOIN blobs ON blobs.sha256 = images.sha256 WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or not os.path.exists(row[4]):
+            return None
+        return {'sha256': row[0], 'etag': row[1], 'last_modified': row[2], 'checked_at': row[3], 'path': row[4]}
+
+    def is_fresh(self, entry):
+        """True if a stored entry was checked recently enough to reuse without a request"""
+        fresh = time.time() - entry['checked_at'] < self.revalidate_after
+        if fresh:
+            self.reused += 1
+        return fresh
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for revalidating a stored entry"""
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_not_modified(self, url):
+        """Record a 304 answer: the stored file is still current"""
+        self.revalidated += 1
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE images SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def open_writer(self):
+        """Start writing a new download"""
+        return BlobWriter(os.path.join(self.root, 'tmp', uuid.uuid4().hex))
+
+    def _blob_path(self, sha256, extension):
+        """Hash-named location, fanned out over subfolders to keep directories small"""
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+    def commit(self, url, writer, extension='.jpg', etag=None, last_modified=None):
+        """Move a finished download into the store (dropping it if the content is already there) and return its path"""
+        writer.close()
+        sha256 = writer.sha256
+        self.downloaded += 1
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is not None and os.path.exists(row[0]):
+                os.remove(writer.temp_path)
+                path = row[0]
+                self.deduplicated += 1
+            else:
+                path = self._blob_path(sha256, extension)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(writer.temp_path, path)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (sha256, path, size) VALUES (?, ?, ?)", (sha256, path, writer.size)
+                )
+            if url is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO images (url, sha256, etag, last_modified, checked_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (url, sha256, etag, last_modified, time.time())
+                )
+        return path
+
+    def put_bytes(self, data, extension='.jpg'):
+        """Store in-memory image bytes (e.g. a decoded data: URL) and return their path"""
+        writer = self.open_writer()
+        writer.write(data)
+        return self.commit(None, writer, extension)
+
+    def link(self, blob_path, dest_path):
+        """Give a stored image a readable name as a hard link, copying if linking is not possible"""
+        if os.path.exists(dest_path):
+            if os.path.samefile(blob_path, dest_path):
+                return dest_path
+            os.remove(dest_path)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError:
+            shutil.copy2(blob_path, dest_path)
+        return dest_path
+
+    def close(self):
+        """Close the index database"""
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self):
+        """Counters for this run"""
+        return {
+            'reused': self.reused,
+            'revalidated': self.revalidated,
+            'downloaded': self.downloaded,
+            'deduplicated': self.deduplicated
+        }
+
+    def print_stats(self):
+        """Print how many downloads the store saved"""
+        stats = self.get_stats()
+        print(f"Image store ({self.root}): {stats['reused']} reused, {stats['revalidated']} revalidated (304), "
+              f"{stats['downloaded']} downloaded, {stats['deduplicated']} duplicates of stored images")
@@ -1,86 +1,545 @@
-from driver_setup import setup_driver
-from xpaths import LISTING_URLS, NEXT_PAGE_BUTTON, BASE_URL
+from driver_setup import setup_driver, DRIVER_PROFILES
+from driver_supervisor import DriverSupervisor, DEFAULT_MAX_PAGES, DEFAULT_MAX_RSS_MB, DEFAULT_MAX_ERRORS
+from xpaths import LISTING_URLS, NEXT_PAGE_BUTTON, BASE_URL, GOOGLE_URL
 from functions import (
     get_listing_urls, click_next_page, extract_listing_details,
-    save_to_csv, update_csv_with_reviews
+    extract_listing_details_from_source, update_csv_with_reviews, open_page, GBP_TIERS, TIER_FULL
 )
-import time
-
-def main():
-    # Initialize the driver
-    driver = setup_driver()
-    
-    # List of URLs to process
-    urls = [
-        "https://pro.restorationindustry.org/directory-search?combine=&field_ams_geofield_proximity%5Bvalue%5D=100&field_ams_geofield_proximity%5Bsource_configuration%5D%5Borigin_address%5D=Connecticut+US%2C+United+States",
-        "https://pro.restorationindustry.org/directory-search?combine=&field_ams_geofield_proximity%5Bvalue%5D=100&field_ams_geofield_proximity%5Bsource_configuration%5D%5Borigin_address%5D=Maine+US%2C+United+States",
-        "https://pro.restorationindustry.org/directory-search?combine=&field_ams_geofield_proximity%5Bvalue%5D=100&field_ams_geofield_proximity%5Bsource_configuration%5D%5Borigin_address%5D=New+hampshire+US%2C+United+States"
-    ]
-    
+from gbp_match import DEFAULT_MIN_CONFIDENCE
+from review_harvest import DEFAULT_REVIEWS_FILE, DEFAULT_MAX_REVIEWS, REVIEW_FIELDNAMES
+from csv_writer import CsvBatchWriter
+from output_sinks import open_sink, OUTPUT_FORMATS, DEFAULT_PARTITION_COLUMN
+from worker_pool import BrowserPool, DEFAULT_WORKERS
+from http_fetcher import iter_listings_http, DEFAULT_CONCURRENCY
+from pagination import collect_listing_urls_direct
+from dedupe import ListingIndex
+from geo_planner import plan_search_urls, STATES
+from checkpoint import CrawlState, DEFAULT_STATE_DB, STATUS_DONE, STATUS_DUPLICATE
+from gbp_cache import GbpCache, DEFAULT_CACHE_DB, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+from pipeline import run_streaming_pipeline, DEFAULT_QUEUE_SIZE
+from waits import wait_for_document_ready, print_wait_report
+from metrics import METRICS, STAGES, STAGE_DIRECTORY_PAGE, DEFAULT_EXPORT_INTERVAL
+from rate_limiter import SCHEDULER, HOST_LIMITS, host_key
+from snapshot_archive import (
+    SnapshotArchive, set_active_archive, is_archiving, archive_page, KIND_RESULTS, DEFAULT_ARCHIVE_DIR
+)
+from offline_extract import reextract_archive, OFFLINE_LISTINGS_FILE, OFFLINE_REVIEWS_FILE
+from recrawl import RecrawlIndex, DEFAULT_RECRAWL_DB, DEFAULT_MIN_REVISIT, DEFAULT_MAX_REVISIT
+from functools import partial
+import argparse
+
+# Listing extraction modes selectable with --extraction
+EXTRACTORS = {
+    'webdriver': extract_listing_details,
+    'page-source': extract_listing_details_from_source
+}
+
+def collect_listing_urls(driver, start_url):
+    """Walk the paginated search results for a start URL and collect listing URLs"""
+    open_page(driver, start_url)
+    wait_for_document_ready(driver, label='directory_page')
+
+    all_urls = []
+    page_number = 1
+
+    # Collect URLs from current starting URL
+    while True:
+        print(f"Scraping page {page_number}...")
+
+        # One directory page: read its listing URLs and move on to the next page
+        with METRICS.stage(STAGE_DIRECTORY_PAGE):
+            page_urls = get_listing_urls(driver, LISTING_URLS)
+            if is_archiving():
+                archive_page(KIND_RESULTS, driver.current_url, driver.page_source, driver.current_url)
+            all_urls.extend(page_urls)
+
+            print(f"Found {len(page_urls)} URLs on page {page_number}")
+
+            # Try to click next page
+            has_next_page = click_next_page(driver, NEXT_PAGE_BUTTON)
+        if not has_next_page:
+            print("Reached last page")
+            break
+
+        page_number += 1
+
+    return all_urls
+
+def extract_listings(supervisor, listing_urls, pool=None, extract_fn=extract_listing_details,
+                     fetcher='browser', http_concurrency=DEFAULT_CONCURRENCY, recrawl=None):
+    """Yield details for each listing URL, fetched over HTTP, with the browser pool, or sequentially"""
+    if fetcher == 'http':
+        print(f"Fetching {len(listing_urls)} listings over HTTP ({http_concurrency} concurrent)")
+        fallback_fn = lambda driver, url: supervisor.run(extract_fn, url)
+        for data in iter_listings_http(
+            listing_urls, http_concurrency, driver=supervisor.driver, fallback_fn=fallback_fn, recrawl=recrawl
+        ):
+            if data:
+                yield data
+        return
+
+    if pool is not None:
+        print(f"Extracting {len(listing_urls)} listings with {pool.num_workers} browser workers")
+        for data in pool.extract(listing_urls):
+            if data:
+                yield data
+        return
+
+    for index, listing_url in enumerate(listing_urls, 1):
+        print(f"\nProcessing listing {index}/{len(listing_urls)}: {listing_url}")
+
+        # Extract details from the listing
+        listing_data = supervisor.run(extract_fn, listing_url)
+
+        if listing_data:
+            print(f"Successfully collected data for {listing_url}")
+            yield listing_data
+        else:
+            print(f"Failed to extract data for {listing_url}")
+
+def reuse_gbp_result(recrawl, state, listing_url):
+    """Carry an unchanged listing's last GBP result into this run, so the GBP phase skips it"""
+    gbp_row = recrawl.get_gbp_row(listing_url)
+    if gbp_row is not None:
+        state.save_gbp_result(listing_url, gbp_row)
+
+def iter_directory_listings(supervisor, urls, listing_index, state, pool=None, extract_fn=extract_listing_details,
+                            fetcher='browser', http_concurrency=DEFAULT_CONCURRENCY, pagination='click',
+                            recrawl=None):
+    """Run the directory phase, yielding each new listing as soon as it is extracted"""
+    for url in urls:
+        print(f"\nProcessing URL: {url}")
+        if state.is_start_url_done(url):
+            all_urls = state.get_listing_urls(url)
+            print("Result pages already collected by an earlier run")
+        else:
+            if pagination == 'direct':
+                all_urls = collect_listing_urls_direct(url, http_concurrency)
+            else:
+                all_urls = supervisor.run(collect_listing_urls, url) or []
+            state.save_start_url(url, all_urls)
+
+        print(f"\nTotal URLs collected from this starting URL: {len(all_urls)}")
+
+        # Drop listings already collected from an earlier start URL
+        new_urls = listing_index.filter_new_urls(all_urls)
+        print(f"{len(all_urls) - len(new_urls)} URLs already seen, {len(new_urls)} new")
+
+        # Reuse listings extracted by an earlier run
+        pending_urls = []
+        for listing_url in new_urls:
+            status = state.get_listing_status(listing_url)
+            if status == STATUS_DONE:
+                listing_data = state.get_listing(listing_url)
+                if not listing_index.is_duplicate_listing(listing_data):
+                    yield listing_data
+            elif status != STATUS_DUPLICATE:
+                pending_urls.append(listing_url)
+        if len(pending_urls) < len(new_urls):
+            print(f"{len(new_urls) - len(pending_urls)} listings already extracted by an earlier run")
+
+        # Incremental mode: listings not yet due for a revisit are reused as stored
+        if recrawl is not None:
+            due_urls = []
+            for listing_url in pending_urls:
+                listing_data = recrawl.get_stored_listing(listing_url)
+                if listing_data is None:
+                    due_urls.append(listing_url)
+                    continue
+                if listing_index.is_duplicate_listing(listing_data):
+                    state.save_listing(listing_url, None, STATUS_DUPLICATE)
+                    continue
+                state.save_listing(listing_url, listing_data)
+                reuse_gbp_result(recrawl, state, listing_url)
+                yield listing_data
+            print(f"{len(pending_urls) - len(due_urls)} listings not due for a revisit, {len(due_urls)} due")
+            pending_urls = due_urls
+
+        # Process each URL and extract details
+        for listing_data in extract_listings(
+            supervisor, pending_urls, pool, extract_fn, fetcher, http_concurrency, recrawl
+        ):
+            if listing_index.is_duplicate_listing(listing_data):
+                state.save_listing(listing_data['url'], None, STATUS_DUPLICATE)
+                continue
+            state.save_listing(listing_data['url'], listing_data)
+            # Only new or changed listings need a fresh Google lookup
+            if recrawl is not None and not recrawl.record(listing_data['url'], listing_data):
+                reuse_gbp_result(recrawl, state, listing_data['url'])
+            yield listing_data
+
+    listing_index.print_report()
+
+def main(num_workers=1, extraction='webdriver', fetcher='browser', http_concurrency=DEFAULT_CONCURRENCY,
+         pagination='click', regions=('CT', 'ME', 'NH'), stream=False, queue_size=DEFAULT_QUEUE_SIZE,
+         resume=False, state_db=DEFAULT_STATE_DB, cache_db=DEFAULT_CACHE_DB, cache_ttl=DEFAULT_TTL,
+         cache_size=DEFAULT_MAX_ENTRIES, gbp_extractor='webdriver', gbp_tier=TIER_FULL,
+         min_confidence=DEFAULT_MIN_CONFIDENCE, all_reviews=False, max_reviews=DEFAULT_MAX_REVIEWS,
+         reviews_file=DEFAULT_REVIEWS_FILE, directory_rate=None, google_rate=None,
+         directory_profile='default', gbp_profile='default', max_pages=DEFAULT_MAX_PAGES,
+         max_rss_mb=DEFAULT_MAX_RSS_MB, max_errors=DEFAULT_MAX_ERRORS, archive_dir=None, offline=False,
+         incremental=False, recrawl_db=DEFAULT_RECRAWL_DB, min_revisit=DEFAULT_MIN_REVISIT,
+         max_revisit=DEFAULT_MAX_REVISIT, output_format=None, output_path='restoration_dataset',
+         partition_column=DEFAULT_PARTITION_COLUMN, metrics_json=None, metrics_prometheus=None,
+         metrics_interval=DEFAULT_EXPORT_INTERVAL, profile_stage=None, profile_output=None, start_urls=None,
+         google_url=GOOGLE_URL):
+    # Re-derive the outputs from archived pages: no browser, no network
+    if offline:
+        archive = SnapshotArchive(archive_dir or DEFAULT_ARCHIVE_DIR)
+        try:
+            reextract_archive(archive)
+        finally:
+            archive.close()
+        return
+
+    # Stage timings, exported while the crawl runs; optionally one stage under cProfile
+    METRICS.configure(metrics_json, metrics_prometheus, metrics_interval, profile_stage, profile_output)
+
+    # Record every fetched directory page and Google results page
+    archive = SnapshotArchive(archive_dir) if archive_dir else None
+    set_active_archive(archive)
+
+    # Starting request rates; the limiter adapts them to how each host responds
+    if directory_rate:
+        SCHEDULER.configure(host_key(BASE_URL), rate=directory_rate)
+    if google_rate:
+        SCHEDULER.configure('google.com', rate=google_rate)
+
+    # Initialize the driver, recycled when it grows too large or stops responding
+    supervisor = DriverSupervisor(
+        partial(setup_driver, directory_profile), max_pages=max_pages, max_rss_mb=max_rss_mb,
+        max_errors=max_errors, name='directory browser'
+    )
+    extract_fn = EXTRACTORS[extraction]
+
+    # Listing workers started once and shared by every start URL
+    pool = None
+    if num_workers > 1 and fetcher == 'browser':
+        pool = BrowserPool(num_workers, supervisor.driver_factory, extract_fn, supervisor.limits)
+
+    # Plan the smallest set of directory searches covering the target regions, unless given explicitly
+    urls = list(start_urls) if start_urls else plan_search_urls(regions)
+
+    # Shared across all start URLs, since their search radii overlap
+    listing_index = ListingIndex()
+
+    # Content hashes and revisit schedule kept across runs for --incremental
+    recrawl = RecrawlIndex(recrawl_db, min_revisit, max_revisit) if incremental else None
+
+    # Crawl progress store; a fresh run clears it, --resume picks up where it stopped
+    state = CrawlState(state_db, resume=resume)
+
+    # GBP results from earlier runs; a TTL of 0 turns the cache off
+    cache = GbpCache(cache_db, ttl=cache_ttl, max_entries=cache_size) if cache_ttl > 0 else None
+
+    # How each Google Business Profile is looked up
+    gbp_options = {
+        'extractor': gbp_extractor,
+        'tier': gbp_tier,
+        'min_confidence': min_confidence,
+        'google_url': google_url
+    }
+
+    # Structured copy of the listings-with-reviews rows, streamed while the GBP phase runs
+    sink = open_sink(output_format, output_path, partition_column) if output_format else None
+
+    # Every review goes to the crawl state and is appended to a separate normalized file as it is
+    # harvested, so rows stay narrow and a crashed run keeps its reviews; the file starts from the
+    # reviews already stored (none on a fresh run) and is rewritten at the end without retried copies
+    review_writer = None
+    if all_reviews:
+        state.export_reviews(reviews_file)
+        review_writer = CsvBatchWriter(reviews_file, REVIEW_FIELDNAMES)
+        gbp_options['review_store'] = state
+        gbp_options['review_writer'] = review_writer
+        gbp_options['max_reviews'] = max_reviews
+
+    gbp_supervisor = None
+
     try:
-        all_listings = []  # Store all listings data
-        
+        listings = iter_directory_listings(
+            supervisor, urls, listing_index, state, pool, extract_fn, fetcher, http_concurrency, pagination,
+            recrawl
+        )
+
+        if stream:
+            # Both phases at once: the GBP stage gets its own browser and consumes
+            # listings from a bounded queue as the directory phase produces them
+            print("\nStarting streaming directory + Google Business Profile pipeline...")
+            gbp_supervisor = DriverSupervisor(
+                partial(setup_driver, gbp_profile), name='GBP browser', **supervisor.limits
+            )
+            run_streaming_pipeline(
+                listings, gbp_supervisor, queue_size, state=state, cache=cache, sink=sink, **gbp_options
+            )
+
+            # Rewrite both files from the store to drop partial or repeated rows
+            state.export_listings()
+            state.export_gbp_results()
+            print("\nReview collection completed!")
+            return
+
         # First phase: Collect all listings from all URLs
-        for url in urls:
-            print(f"\nProcessing URL: {url}")
-            driver.get(url)
-            time.sleep(3)
-            
-            all_urls = []
-            page_number = 1
-            
-            # Collect URLs from current starting URL
-            while True:
-                print(f"Scraping page {page_number}...")
-                
-                # Get URLs from current page
-                page_urls = get_listing_urls(driver, LISTING_URLS)
-                all_urls.extend(page_urls)
-                
-                print(f"Found {len(page_urls)} URLs on page {page_number}")
-                
-                # Try to click next page
-                if not click_next_page(driver, NEXT_PAGE_BUTTON):
-                    print("Reached last page")
-                    break
-                    
-                page_number += 1
-            
-            print(f"\nTotal URLs collected from this starting URL: {len(all_urls)}")
-            
-            # Process each URL and extract details
-            for index, listing_url in enumerate(all_urls, 1):
-                print(f"\nProcessing listing {index}/{len(all_urls)}: {listing_url}")
-                
-                # Extract details from the listing
-                listing_data = extract_listing_details(driver, listing_url)
-                
-                if listing_data:
-                    all_listings.append(listing_data)  # Store the data instead of saving immediately
-                    print(f"Successfully collected data for {listing_url}")
-                else:
-                    print(f"Failed to extract data for {listing_url}")
-                
-                # Add a small delay between requests
-                time.sleep(1)
-        
+        all_listings = list(listings)
+        if pool is not None:
+            pool.close()
+
         # After collecting all listings, save them to CSV
         print("\nSaving all collected listings to CSV...")
-        for listing_data in all_listings:
-            save_to_csv(listing_data)
+        state.export_listings()
         print(f"Successfully saved {len(all_listings)} listings to CSV")
-        
+
         # Second phase: Collect Google Business Profile reviews
         print("\nStarting Google Business Profile review collection...")
-        update_csv_with_reviews(driver)
+        if gbp_profile != directory_profile:
+            supervisor.recycle("switching to the GBP profile", partial(setup_driver, gbp_profile))
+        update_csv_with_reviews(supervisor, state=state, cache=cache, sink=sink, **gbp_options)
+        state.export_gbp_results()
         print("\nReview collection completed!")
-                
+
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-    
+
     finally:
-        # Close the browser
-        driver.quit()
+        # Close the browsers
+        if pool is not None:
+            pool.close()
+        supervisor.quit()
+        supervisor.print_stats()
+        if gbp_supervisor is not None:
+            gbp_supervisor.quit()
+            gbp_supervisor.print_stats()
+        if review_writer is not None:
+            review_writer.close()
+            print(f"Exported {state.export_reviews(reviews_file)} reviews to {reviews_file}")
+        state.print_summary()
+        if recrawl is not None:
+            recrawl.save_gbp_rows(state.get_gbp_rows())
+            recrawl.print_stats()
+            recrawl.close()
+        state.close()
+        if cache is not None:
+            cache.print_stats()
+            cache.close()
+        if sink is not None:
+            sink.close()
+            print(f"Wrote {sink.rows_written} rows to {output_path}")
+        SCHEDULER.print_rates()
+        if archive is not None:
+            set_active_archive(None)
+            archive.print_stats()
+            archive.close()
+        print_wait_report()
+        METRICS.print_summary()
+        METRICS.export()
+        METRICS.dump_profile()
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Scrape restoration industry listings and their Google Business Profiles")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help=f"number of parallel browser workers for listing extraction (0 = one per core, {DEFAULT_WORKERS} here)"
+    )
+    parser.add_argument(
+        "--extraction", choices=sorted(EXTRACTORS), default='webdriver',
+        help="'webdriver' queries each field in the browser, 'page-source' parses the page HTML once locally"
+    )
+    parser.add_argument(
+        "--fetcher", choices=['browser', 'http'], default='browser',
+        help="'http' fetches listing pages with pooled requests and only falls back to the browser for incomplete pages"
+    )
+    parser.add_argument(
+        "--http-concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="maximum concurrent HTTP requests for the http fetcher"
+    )
+    parser.add_argument(
+        "--pagination", choices=['click', 'direct'], default='click',
+        help="'direct' requests the ?page=N result pages concurrently instead of clicking through the pager"
+    )
+    parser.add_argument(
+        "--states", nargs='+', default=['CT', 'ME', 'NH'],
+        help="target states (codes or names) to cover, or 'all' for every state"
+    )
+    parser.add_argument(
+        "--stream", action='store_true',
+        help="overlap the directory and GBP phases through a bounded queue instead of running them one after another"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+        help="maximum listings buffered between the directory and GBP phases in --stream mode"
+    )
+    parser.add_argument(
+        "--resume", action='store_true',
+        help="continue an interrupted run, skipping pages, listings and GBP lookups already completed"
+    )
+    parser.add_argument(
+        "--state-db", default=DEFAULT_STATE_DB,
+        help="SQLite file recording crawl progress"
+    )
+    parser.add_argument(
+        "--gbp-cache-db", default=DEFAULT_CACHE_DB,
+        help="SQLite file caching Google Business Profile lookups between runs"
+    )
+    parser.add_argument(
+        "--gbp-cache-ttl-hours", type=float, default=DEFAULT_TTL / 3600,
+        help="re-query Google for cached results older than this (0 disables the cache)"
+    )
+    parser.add_argument(
+        "--gbp-cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+        help="maximum cached GBP results before least recently used ones are evicted"
+    )
+    parser.add_argument(
+        "--gbp-extractor", choices=['webdriver', 'script'], default='webdriver',
+        help="'script' reads the whole knowledge panel, reviews and ratings with one injected JavaScript call"
+    )
+    parser.add_argument(
+        "--gbp-tier", choices=GBP_TIERS, default=TIER_FULL,
+        help="'panel' reads only the knowledge panel, 'reviews' adds reviews, 'full' adds embedded images"
+    )
+    parser.add_argument(
+        "--min-match-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+        help="panels matching the listing less than this (0-1) only get the panel tier"
+    )
+    parser.add_argument(
+        "--all-reviews", action='store_true',
+        help="scroll-load every review into the crawl state and export them to --reviews-file, keyed by listing URL"
+    )
+    parser.add_argument(
+        "--max-reviews", type=int, default=DEFAULT_MAX_REVIEWS,
+        help="stop harvesting a business's reviews after this many"
+    )
+    parser.add_argument(
+        "--reviews-file", default=DEFAULT_REVIEWS_FILE,
+        help="CSV file rewritten with all harvested reviews at the end of the run"
+    )
+    parser.add_argument(
+        "--directory-rate", type=float,
+        help=f"starting requests/second to the directory (default {HOST_LIMITS['pro.restorationindustry.org']['rate']}), adapted during the run"
+    )
+    parser.add_argument(
+        "--google-rate", type=float,
+        help=f"starting Google searches/second (default {HOST_LIMITS['google.com']['rate']}), adapted during the run"
+    )
+    parser.add_argument(
+        "--directory-profile", choices=sorted(DRIVER_PROFILES), default='default',
+        help="browser profile for the directory phase ('directory' is headless, eager and blocks images, fonts, media and analytics)"
+    )
+    parser.add_argument(
+        "--gbp-profile", choices=sorted(DRIVER_PROFILES), default='default',
+        help="browser profile for the GBP phase ('gbp' keeps images so their URLs resolve)"
+    )
+    parser.add_argument(
+        "--recycle-after-pages", type=int, default=DEFAULT_MAX_PAGES,
+        help="restart each browser after this many pages"
+    )
+    parser.add_argument(
+        "--max-browser-memory-mb", type=int, default=DEFAULT_MAX_RSS_MB,
+        help="restart a browser whose processes use more memory than this (needs psutil)"
+    )
+    parser.add_argument(
+        "--max-driver-errors", type=int, default=DEFAULT_MAX_ERRORS,
+        help="restart a browser after this many failed pages in a row"
+    )
+    parser.add_argument(
+        "--archive-dir",
+        help="record every fetched directory and Google results page into this zstd snapshot archive"
+    )
+    parser.add_argument(
+        "--offline", action='store_true',
+        help=f"rebuild the CSVs from the archive (--archive-dir, default {DEFAULT_ARCHIVE_DIR}) with the current XPaths "
+             f"into {OFFLINE_LISTINGS_FILE} and {OFFLINE_REVIEWS_FILE}, leaving the live crawl's CSVs untouched, and exit"
+    )
+    parser.add_argument(
+        "--incremental", action='store_true',
+        help="only re-extract listings due for a revisit, and only look up new or changed listings on Google"
+    )
+    parser.add_argument(
+        "--recrawl-db", default=DEFAULT_RECRAWL_DB,
+        help="SQLite file keeping listing content hashes and revisit times across runs"
+    )
+    parser.add_argument(
+        "--min-revisit-hours", type=float, default=DEFAULT_MIN_REVISIT / 3600,
+        help="revisit a listing after this long; the interval doubles each time it is found unchanged"
+    )
+    parser.add_argument(
+        "--max-revisit-days", type=float, default=DEFAULT_MAX_REVISIT / 86400,
+        help="longest interval between two visits of a listing"
+    )
+    parser.add_argument(
+        "--output-format", choices=OUTPUT_FORMATS,
+        help="also stream the listings-with-reviews rows to --output-path; jsonl/parquet are partitioned "
+             "datasets with extra_fields as a map and the image URLs grouped in an 'images' column"
+    )
+    parser.add_argument(
+        "--output-path", default='restoration_dataset',
+        help="file (csv) or dataset folder (jsonl, parquet) for --output-format"
+    )
+    parser.add_argument(
+        "--partition-column", default=DEFAULT_PARTITION_COLUMN,
+        help="column whose values split a jsonl/parquet dataset into folders"
+    )
+    parser.add_argument(
+        "--start-urls", nargs='+',
+        help="directory search URLs to crawl instead of the ones planned for --states"
+    )
+    parser.add_argument("--google-url", default=GOOGLE_URL, help="Google home page the business searches start from")
+    parser.add_argument("--metrics-json", help="write per-stage and per-XPath timing statistics to this JSON file")
+    parser.add_argument(
+        "--metrics-prometheus",
+        help="write the timing histograms to this file in the Prometheus text format (node_exporter textfile collector)"
+    )
+    parser.add_argument(
+        "--metrics-interval", type=int, default=DEFAULT_EXPORT_INTERVAL,
+        help="seconds between metrics exports during the crawl"
+    )
+    parser.add_argument("--profile-stage", choices=STAGES, help="run every call of one stage under cProfile")
+    parser.add_argument("--profile-output", help="save the --profile-stage statistics here (pstats format)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    main(
+        num_workers=args.workers or DEFAULT_WORKERS,
+        extraction=args.extraction,
+        fetcher=args.fetcher,
+        http_concurrency=args.http_concurrency,
+        pagination=args.pagination,
+        regions=list(STATES) if args.states == ['all'] else args.states,
+        stream=args.stream,
+        queue_size=args.queue_size,
+        resume=args.resume,
+        state_db=args.state_db,
+        cache_db=args.gbp_cache_db,
+        cache_ttl=args.gbp_cache_ttl_hours * 3600,
+        cache_size=args.gbp_cache_size,
+        gbp_extractor=args.gbp_extractor,
+        gbp_tier=args.gbp_tier,
+        min_confidence=args.min_match_confidence,
+        all_reviews=args.all_reviews,
+        max_reviews=args.max_reviews,
+        reviews_file=args.reviews_file,
+        directory_rate=args.directory_rate,
+        google_rate=args.google_rate,
+        directory_profile=args.directory_profile,
+        gbp_profile=args.gbp_profile,
+        max_pages=args.recycle_after_pages,
+        max_rss_mb=args.max_browser_memory_mb,
+        max_errors=args.max_driver_errors,
+        archive_dir=args.archive_dir,
+        offline=args.offline,
+        incremental=args.incremental,
+        recrawl_db=args.recrawl_db,
+        min_revisit=args.min_revisit_hours * 3600,
+        max_revisit=args.max_revisit_days * 86400,
+        output_format=args.output_format,
+        output_path=args.output_path,
+        partition_column=args.partition_column,
+        metrics_json=args.metrics_json,
+        metrics_prometheus=args.metrics_prometheus,
+        metrics_interval=args.metrics_interval,
+        profile_stage=args.profile_stage,
+        profile_output=args.profile_output,
+        start_urls=args.start_urls,
+        google_url=args.google_url
+    )
@@ -0,0 +1,299 @@
+import cProfile
+import json
+import math
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+from xpaths import DETAIL_XPATHS, GBP_XPATHS
+
+# Crawl stages timed end to end
+STAGE_DIRECTORY_PAGE = 'directory_page'
+STAGE_LISTING_DETAIL = 'listing_detail'
+STAGE_GBP_LOOKUP = 'gbp_lookup'
+STAGE_GOOGLE_SEARCH = 'google_search'
+STAGE_REVIEW_EXPANSION = 'review_expansion'
+STAGE_IMAGE_MODAL = 'image_modal'
+STAGES = (
+    STAGE_DIRECTORY_PAGE, STAGE_LISTING_DETAIL, STAGE_GBP_LOOKUP,
+    STAGE_GOOGLE_SEARCH, STAGE_REVIEW_EXPANSION, STAGE_IMAGE_MODAL
+)
+
+# Metric families: crawl stages, single XPath lookups and readiness waits (see waits.py)
+FAMILY_STAGE = 'stage'
+FAMILY_XPATH = 'xpath'
+FAMILY_WAIT = 'wait'
+
+# XPath lookups are only timed on the webdriver extractor; the page-source, HTTP and script
+# extractors evaluate their XPaths in one pass, so their cost shows in the listing and GBP stages
+FAMILY_NOTES = {FAMILY_XPATH: ' (webdriver extraction only)'}
+
+# Outcomes counted per series
+OUTCOME_OK = 'ok'
+OUTCOME_ERROR = 'error'
+OUTCOME_HIT = 'hit'
+OUTCOME_TIMEOUT = 'timeout'
+
+# Histogram bucket upper bounds in seconds, Prometheus style
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Recent samples kept per series for percentiles
+MAX_SAMPLES = 2048
+
+# Seconds between automatic exports while the crawl runs
+DEFAULT_EXPORT_INTERVAL = 60
+
+# Prefix of every exported Prometheus metric
+PROMETHEUS_PREFIX = 'restoration_scraper'
+
+# XPath -> readable lookup name, e.g. 'detail.title' or 'gbp.gbp_phone'
+XPATH_NAMES = {xpath: f'detail.{field}' for field, xpath in DETAIL_XPATHS.items()}
+XPATH_NAMES.update({xpath: f'gbp.{field}' for field, xpath in GBP_XPATHS.items()})
+
+def xpath_name(xpath):
+    """Name an XPath is reported under"""
+    return XPATH_NAMES.get(xpath, 'other')
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class Histogram:
+    """Latency histogram of one series, with outcome counts and recent samples"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.outcomes = {}
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def observe(self, seconds, outcome):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.samples.append(seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def summary(self, minutes):
+        """JSON-ready statistics; minutes is the crawl's running time, for the per-minute rate"""
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'outcomes': dict(self.outcomes),
+            'total_seconds': round(self.total, 3),
+            'mean_seconds': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_seconds': round(percentile(samples, 0.50), 3),
+            'p95_seconds': round(percentile(samples, 0.95), 3),
+            'max_seconds': round(self.max, 3),
+            'per_minute': round(self.count / minutes, 2) if minutes > 0 else 0.0
+        }
+
+class _StageTimer(ContextDecorator):
+    """Times one stage run; usable as a `with` block or as a function decorator"""
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+        self._local = threading.local()
+
+    def __enter__(self):
+        # Per thread and nested, since worker threads and recursion share one timer object
+        starts = getattr(self._local, 'starts', None)
+        if starts is None:
+            starts = self._local.starts = []
+        starts.append((time.monotonic(), self.registry._start_profiling(self.stage)))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        started, profiling = self._local.starts.pop()
+        if profiling:
+            self.registry._stop_profiling()
+        outcome = OUTCOME_OK if exc_type is None else OUTCOME_ERROR
+        self.registry.observe(FAMILY_STAGE, self.stage, time.monotonic() - started, outcome)
+        return False
+
+class Metrics:
+    """Thread-safe latency histograms and outcome counts for the crawl, exportable as JSON and Prometheus text"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._series = {}
+        self._timers = {}
+        self._lock = threading.Lock()
+        self._json_path = None
+        self._prometheus_path = None
+        self._export_interval = DEFAULT_EXPORT_INTERVAL
+        self._last_export = time.monotonic()
+        self._profiled_stage = None
+        self._profile_path = None
+        self._profiler = None
+        self._profiling_thread = None
+
+    def configure(self, json_path=None, prometheus_path=None, export_interval=DEFAULT_EXPORT_INTERVAL,
+                  profile_stage=None, profile_path=None):
+        """Set the export files (rewritten every export_interval seconds) and the stage to run under cProfile"""
+        self._json_path = json_path
+        self._prometheus_path = prometheus_path
+        self._export_interval = export_interval
+        self._profiled_stage = profile_stage
+        self._profile_path = profile_path
+        self._profiler = cProfile.Profile() if profile_stage else None
+
+    def observe(self, family, name, seconds, outcome=OUTCOME_OK):
+        """Record one timed operation"""
+        with self._lock:
+            series = self._series.get((family, name))
+            if series is None:
+                series = self._series[(family, name)] = Histogram()
+            series.observe(seconds, outcome)
+            due = (self._json_path or self._prometheus_path) and \
+                time.monotonic() - self._last_export >= self._export_interval
+            if due:
+                self._last_export = time.monotonic()
+        if due:
+            self.export()
+
+    def stage(self, name):
+        """Timer for a crawl stage: `with METRICS.stage(...)` or `@METRICS.stage(...)`"""
+        with self._lock:
+            if name not in self._timers:
+                self._timers[name] = _StageTimer(self, name)
+            return self._timers[name]
+
+    def record_lookup(self, xpath, seconds, found):
+        """Record one single-element XPath lookup as a hit or a timeout"""
+        self.observe(FAMILY_XPATH, xpath_name(xpath), seconds, OUTCOME_HIT if found else OUTCOME_TIMEOUT)
+
+    def _start_profiling(self, stage):
+        """Enable the profiler for a run of the profiled stage; True if this run is profiled"""
+        if self._profiler is None or stage != self._profiled_stage:
+            return False
+        with self._lock:
+            # cProfile follows one thread, so concurrent runs of the stage go unprofiled
+            if self._profiling_thread is not None:
+                return False
+            self._profiling_thread = threading.get_ident()
+        self._profiler.enable()
+        return True
+
+    def _stop_profiling(self):
+        self._profiler.disable()
+        with self._lock:
+            self._profiling_thread = None
+
+    def summary(self):
+        """{family: {name: statistics}} plus the crawl's running time"""
+        minutes = (time.time() - self.started) / 60
+        with self._lock:
+            report = {family: {} for family in (FAMILY_STAGE, FAMILY_XPATH, FAMILY_WAIT)}
+            for (family, name), series in sorted(self._series.items()):
+                report.setdefault(family, {})[name] = series.summary(minutes)
+        report['elapsed_minutes'] = round(minutes, 2)
+        return report
+
+    def prometheus_text(self):
+        """All series in the Prometheus text exposition format"""
+        label_names = {FAMILY_STAGE: 'stage', FAMILY_XPATH: 'xpath', FAMILY_WAIT: 'wait'}
+        minutes = (time.time() - self.started) / 60
+        with self._lock:
+            series_items = sorted(self._series.items())
+            lines = []
+            for family, label in label_names.items():
+                family_series = [(name, series) for (series_family, name), series in series_items
+                                 if series_family == family]
+                if not family_series:
+                    continue
+                metric = f'{PROMETHEUS_PREFIX}_{family}_seconds'
+                lines.append(f'# HELP {metric} Duration of each {label} in seconds{FAMILY_NOTES.get(family, "")}')
+                lines.append(f'# TYPE {metric} histogram')
+                for name, series in family_series:
+                    cumulative = 0
+                    for bound, bucket_count in zip(BUCKETS, series.bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {series.count}')
+                    lines.append(f'{metric}_sum{{{label}="{name}"}} {series.total:.6f}')
+                    lines.append(f'{metric}_count{{{label}="{name}"}} {series.count}')
+
+                metric = f'{PROMETHEUS_PREFIX}_{family}_total'
+                lines.append(f'# HELP {metric} Completed {label}s by outcome{FAMILY_NOTES.get(family, "")}')
+                lines.append(f'# TYPE {metric} counter')
+                for name, series in family_series:
+                    for outcome, count in sorted(series.outcomes.items()):
+                        lines.append(f'{metric}{{{label}="{name}",outcome="{outcome}"}} {count}')
+
+            metric = f'{PROMETHEUS_PREFIX}_stage_per_minute'
+            lines.append(f'# HELP {metric} Completed stage runs per minute since the crawl started')
+            lines.append(f'# TYPE {metric} gauge')
+            for (family, name), series in series_items:
+                if family == FAMILY_STAGE and minutes > 0:
+                    lines.append(f'{metric}{{stage="{name}"}} {series.count / minutes:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        """Write the configured JSON summary and Prometheus textfile"""
+        try:
+            if self._json_path:
+                _write_atomic(self._json_path, json.dumps(self.summary(), indent=2))
+            if self._prometheus_path:
+                _write_atomic(self._prometheus_path, self.prometheus_text())
+        except OSError as e:
+            print(f"Error exporting metrics: {str(e)}")
+
+    def dump_profile(self, top=25):
+        """Save the profiled stage's stats and print its most expensive calls"""
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        try:
+            stats = pstats.Stats(self._profiler)
+        except TypeError:
+            # pstats refuses a profiler that never ran
+            print(f"\nStage '{self._profiled_stage}' never ran, nothing profiled")
+            return
+        if self._profile_path:
+            stats.dump_stats(self._profile_path)
+            print(f"\nProfile of stage '{self._profiled_stage}' saved to {self._profile_path}")
+        stats.sort_stats('cumulative').print_stats(top)
+
+    def print_summary(self):
+        """Print per-stage latency, rate and timeout counts"""
+        report = self.summary()
+        if not any(report[family] for family in (FAMILY_STAGE, FAMILY_XPATH)):
+            return
+        print(f"\nStage timings ({report['elapsed_minutes']} min):")
+        for name, stats in report[FAMILY_STAGE].items():
+            print(
+                f"  {name}: {stats['count']} runs ({stats['per_minute']}/min), p50 {stats['p50_seconds']}s, "
+                f"p95 {stats['p95_seconds']}s, max {stats['max_seconds']}s, "
+                f"{stats['outcomes'].get(OUTCOME_ERROR, 0)} errors"
+            )
+        if report[FAMILY_XPATH]:
+            print(f"XPath lookups{FAMILY_NOTES[FAMILY_XPATH]}:")
+            for name, stats in report[FAMILY_XPATH].items():
+                print(
+                    f"  {name}: {stats['outcomes'].get(OUTCOME_HIT, 0)} hits, "
+                    f"{stats['outcomes'].get(OUTCOME_TIMEOUT, 0)} timeouts, "
+                    f"p50 {stats['p50_seconds']}s, total {stats['total_seconds']}s"
+                )
+
+def _write_atomic(path, text):
+    """Replace a file in one step, so scrapers never read a half-written export"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as output:
+        output.write(text)
+    os.replace(temp_path, path)
+
+# Shared by every module of the crawl
+METRICS = Metrics()
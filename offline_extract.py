@@ -0,0 +1,60 @@
+from parsers import parse_listing_html, parse_gbp_html
+from functions import write_csv, extract_cid_from_href, create_maps_url
+from dedupe import ListingIndex
+from snapshot_archive import KIND_LISTING, KIND_GBP
+
+# Offline output goes next to, never over, the CSVs of the live crawl
+OFFLINE_LISTINGS_FILE = 'restoration_listings_offline.csv'
+OFFLINE_REVIEWS_FILE = 'restoration_listings_with_reviews_offline.csv'
+
+def gbp_row_from_snapshot(html, page_url=None):
+    """GBP columns for a listing from its archived Google results page"""
+    parsed = parse_gbp_html(html, page_url)
+    gbp_data = {
+        field: parsed[field]
+        for field in ('gbp_title', 'gbp_address', 'gbp_phone', 'gbp_website',
+                      'gbp_image', 'gbp_map_image', 'gbp_outside_image')
+    }
+    gbp_data['gbp_maps_url'] = create_maps_url(extract_cid_from_href(parsed['gbp_cid_link']))
+
+    reviews, ratings = parsed['reviews'], parsed['ratings']
+    for i in range(5):
+        gbp_data[f'review_{i+1}'] = reviews[i] if i < len(reviews) else ""
+        gbp_data[f'review_rating_{i+1}'] = ratings[i] if i < len(ratings) else ""
+
+    embedded = parsed['embedded_images']
+    for i in range(3):
+        gbp_data[f'gbp_embedded_url_{i+1}'] = embedded[i] if i < len(embedded) else ""
+    return gbp_data
+
+def reextract_archive(archive, listings_file=OFFLINE_LISTINGS_FILE, reviews_file=OFFLINE_REVIEWS_FILE):
+    """Rebuild both output CSVs from archived pages with the current XPaths, without a browser or network"""
+    listing_index = ListingIndex()
+    listings = []
+    for url, _, _, _, html in archive.iter_latest(KIND_LISTING):
+        try:
+            data = parse_listing_html(html, url)
+        except Exception as e:
+            print(f"Error parsing archived {url}: {str(e)}")
+            continue
+        if listing_index.is_duplicate_listing(data):
+            continue
+        listings.append(data)
+
+    rows = []
+    gbp_found = 0
+    for listing in listings:
+        row = dict(listing)
+        html = archive.get_latest(KIND_GBP, listing['url'])
+        if html:
+            try:
+                row.update(gbp_row_from_snapshot(html))
+                gbp_found += 1
+            except Exception as e:
+                print(f"Error parsing archived GBP page for {listing['url']}: {str(e)}")
+        rows.append(row)
+
+    write_csv(listings, listings_file)
+    write_csv(rows, reviews_file)
+    print(f"Re-extracted {len(listings)} listings ({listing_index.duplicate_records} duplicates dropped) "
+          f"and {gbp_found} GBP pages from {archive.root} into {listings_file} and {reviews_file}")
@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+import glob
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+from csv_writer import CsvBatchWriter, CSV_FIELDNAMES, IMAGE_COLUMNS, DEFAULT_BATCH_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Parquet output is unavailable without pyarrow; CSV and JSONL still work
+    pa = None
+    pq = None
+
+# Plain text columns of a structured record (the image columns are stored together as one 'images' struct)
+SCALAR_COLUMNS = [column for column in CSV_FIELDNAMES if column not in IMAGE_COLUMNS and column != 'extra_fields']
+
+# Rows are partitioned into one folder per value of this column (Hive style, e.g. administrative_area=CT)
+DEFAULT_PARTITION_COLUMN = 'administrative_area'
+
+# Output formats selectable with --output-format
+OUTPUT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+def to_record(row):
+    """Structured form of an output row: text columns, extra_fields as a map and an images group"""
+    record = {column: (str(row[column]) if row.get(column) not in (None, '') else None) for column in SCALAR_COLUMNS}
+    record['extra_fields'] = {str(key): str(value) for key, value in (row.get('extra_fields') or {}).items()}
+    record['images'] = {column: row.get(column) or None for column in IMAGE_COLUMNS}
+    return record
+
+def partition_name(record, partition_column):
+    """Folder name of the partition a record belongs to"""
+    # URI-escaped, which is how Hive-partitioned readers (pyarrow, Spark, DuckDB) decode folder names
+    return f"{partition_column}={quote(record.get(partition_column) or 'unknown', safe='')}"
+
+class PartitionedSink(ABC):
+    """Stream structured rows into per-partition files, buffering a batch per partition"""
+
+    extension = ''
+
+    def __init__(self, path, partition_column=DEFAULT_PARTITION_COLUMN, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.partition_column = partition_column
+        self.batch_size = batch_size
+        self.rows_written = 0
+        # Part files are named by run, so runs never write into each other's files
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Start from an empty dataset, like the CSV outputs which are rewritten every run
+        for old_file in glob.glob(os.path.join(path, '*', f'part-*{self.extension}')):
+            os.remove(old_file)
+        os.makedirs(path, exist_ok=True)
+
+    def _part_path(self, partition):
+        """File a partition's rows are written to in this run"""
+        folder = os.path.join(self.path, partition)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"part-{self.run_id}{self.extension}")
+
+    def writerow(self, row):
+        """Buffer one row in its partition, writing the partition when its batch is full"""
+        try:
+            record = to_record(row)
+        except Exception as e:
+            print(f"Error converting row for {self.path}: {str(e)}")
+            return
+        partition = partition_name(record, self.partition_column)
+        with self._lock:
+            buffer = self._buffers.setdefault(partition, [])
+            buffer.append(record)
+            if len(buffer) >= self.batch_size:
+                self._write_partition(partition)
+
+    def _write_partition(self, partition):
+        """Write and clear one partition's buffer (caller holds the lock)"""
+        records = self._buffers.pop(partition, [])
+        if records:
+            self._write_records(partition, records)
+            self.rows_written += len(records)
+
+    @abstractmethod
+    def _write_records(self, partition, records):
+        """Append a batch of records to a partition's file"""
+
+    def flush(self):
+        """Write every buffered row"""
+        with self._lock:
+            for partition in list(self._buffers):
+                self._write_partition(partition)
+
+    def close(self):
+        """Write remaining rows and close all files"""
+        with self._lock:
+            if self._closed:
+                return
+            for partition in list(self._buffers):
+                self._write_partition(partition)
+            self._close_files()
+            self._closed = True
+
+    def _close_files(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class JsonlSink(PartitionedSink):
+    """One JSON object per line, extra_fields and images as nested objects"""
+
+    extension = '.jsonl'
+
+    def _write_records(self, partition, records):
+        with open(self._part_path(partition), 'a', encoding='utf-8') as part_file:
+            part_file.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+class ParquetSink(PartitionedSink):
+    """Parquet with extra_fields as a map column and the image URLs as one struct column; a row group per batch
+
+    The partition column lives only in the folder names, so readers get it back from the Hive partitioning.
+    """
+
+    extension = '.parquet'
+
+    def __init__(self, path, partition_column=DEFAULT_PARTITION_COLUMN, batch_size=DEFAULT_BATCH_SIZE):
+        if pa is None:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.schema = pa.schema(
+            [pa.field(column, pa.string()) for column in SCALAR_COLUMNS if column != partition_column]
+            + [pa.field('extra_fields', pa.map_(pa.string(), pa.string())),
+               pa.field('images', pa.struct([pa.field(column, pa.string()) for column in IMAGE_COLUMNS]))]
+        )
+        self._writers = {}
+        super().__init__(path, partition_column, batch_size)
+
+    def _write_records(self, partition, records):
+        if partition not in self._writers:
+            self._writers[partition] = pq.ParquetWriter(self._part_path(partition), self.schema, compression='zstd')
+        for record in records:
+            record['extra_fields'] = list(record['extra_fields'].items())
+        self._writers[partition].write_table(pa.Table.from_pylist(records, schema=self.schema))
+
+    def _close_files(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+def open_sink(output_format, path, partition_column=DEFAULT_PARTITION_COLUMN):
+    """Open an output sink: a CSV file, or a partitioned JSONL/Parquet dataset folder"""
+    if output_format == 'csv':
+        return CsvBatchWriter(path)
+    if output_format == 'jsonl':
+        return JsonlSink(path, partition_column)
+    if output_format == 'parquet':
+        return ParquetSink(path, partition_column)
+    raise ValueError(f"Unknown output format: {output_format}")
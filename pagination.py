@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from http_fetcher import create_session, fetch_html, DEFAULT_CONCURRENCY
+from snapshot_archive import archive_page, KIND_RESULTS
+from parsers import parse_listing_urls, parse_last_page_url
+from metrics import METRICS, STAGE_DIRECTORY_PAGE
+
+# Safety limit on the number of result pages per start URL
+MAX_PAGES = 500
+
+# Failed pages in a row after which probing an unknown page count gives up
+MAX_CONSECUTIVE_FAILURES = 3
+
+def build_page_url(start_url, page):
+    """Build the search URL for a result page (Drupal pagers are zero-based)"""
+    parts = urlsplit(start_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'page']
+    if page > 0:
+        query.append(('page', str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+def get_page_number(url):
+    """Read the page query parameter from a search URL"""
+    for key, value in parse_qsl(urlsplit(url).query):
+        if key == 'page' and value.isdigit():
+            return int(value)
+    return None
+
+@METRICS.stage(STAGE_DIRECTORY_PAGE)
+def _fetch_page(session, page_url):
+    """Fetch one result page, returning (listing URLs, HTML) or (None, None) on failure"""
+    page_source = fetch_html(page_url, session)
+    if page_source is None:
+        return None, None
+    archive_page(KIND_RESULTS, page_url, page_source, page_url)
+    return parse_listing_urls(page_source, page_url), page_source
+
+def _fetch_pages(executor, session, start_url, pages):
+    """Fetch several result pages concurrently, keeping page order"""
+    page_urls = [build_page_url(start_url, page) for page in pages]
+    return list(executor.map(lambda page_url: _fetch_page(session, page_url)[0], page_urls))
+
+def collect_listing_urls_direct(start_url, max_workers=DEFAULT_CONCURRENCY, max_pages=MAX_PAGES):
+    """Collect listing URLs by requesting every ?page=N result page directly and concurrently"""
+    session = create_session(pool_size=max_workers)
+    all_urls = []
+
+    try:
+        # The first page tells us how many pages there are, when the pager shows it
+        first_urls, first_source = _fetch_page(session, build_page_url(start_url, 0))
+        if not first_urls:
+            print("No listings found on the first page")
+            return []
+        print(f"Found {len(first_urls)} URLs on page 1")
+        all_urls.extend(first_urls)
+
+        last_page = get_page_number(parse_last_page_url(first_source, start_url))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if last_page is not None:
+                # Known page count: fetch every remaining page at once
+                pages = list(range(1, min(last_page, max_pages - 1) + 1))
+                for page, page_urls in zip(pages, _fetch_pages(executor, session, start_url, pages)):
+                    if page_urls is None:
+                        print(f"Failed to fetch page {page + 1}")
+                        continue
+                    print(f"Found {len(page_urls)} URLs on page {page + 1}")
+                    all_urls.extend(page_urls)
+            else:
+                # Unknown page count: probe windows of pages until one comes back empty or repeats
+                # what we already have (Drupal Views answers an out-of-range ?page=N with the last page)
+                seen = set(all_urls)
+                page = 1
+                failures = 0
+                reached_end = False
+                while not reached_end and page < max_pages:
+                    pages = list(range(page, min(page + max_workers, max_pages)))
+                    for page_number, page_urls in zip(pages, _fetch_pages(executor, session, start_url, pages)):
+                        if page_urls is None:
+                            print(f"Failed to fetch page {page_number + 1}")
+                            failures += 1
+                            if failures >= MAX_CONSECUTIVE_FAILURES:
+                                print(f"Giving up after {failures} failed pages in a row")
+                                reached_end = True
+                                break
+                            continue
+                        failures = 0
+                        new_urls = [url for url in page_urls if url not in seen]
+                        if not new_urls:
+                            reached_end = True
+                            break
+                        print(f"Found {len(page_urls)} URLs on page {page_number + 1}")
+                        seen.update(new_urls)
+                        all_urls.extend(page_urls)
+                    page += len(pages)
+
+        print("Reached last page")
+    finally:
+        session.close()
+
+    # Drop URLs repeated across pages while keeping their order
+    return list(dict.fromkeys(all_urls))
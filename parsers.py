@@ -0,0 +1,168 @@
+from lxml import etree, html as lxml_html
+from urllib.parse import urljoin
+from xpaths import DETAIL_XPATHS, EXTRA_FIELDS_XPATH, STANDARD_FIELDS, LISTING_URLS, LAST_PAGE_BUTTON, GBP_XPATHS
+
+# Tags that start a new line in the rendered text, like WebDriver's element.text
+_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul'
+}
+_SKIPPED_TAGS = {'script', 'style', 'noscript', 'template'}
+
+# Precompiled XPath objects, built once at import time
+DETAIL_XPATH_OBJECTS = {field: etree.XPath(xpath) for field, xpath in DETAIL_XPATHS.items()}
+EXTRA_FIELDS_XPATH_OBJECT = etree.XPath(EXTRA_FIELDS_XPATH)
+EXTRA_FIELD_KEY_XPATH = etree.XPath("./div")
+EXTRA_FIELD_VALUE_XPATH = etree.XPath("./div[2]")
+LISTING_URLS_XPATH_OBJECT = etree.XPath(LISTING_URLS)
+LAST_PAGE_XPATH_OBJECT = etree.XPath(LAST_PAGE_BUTTON)
+GBP_XPATH_OBJECTS = {field: etree.XPath(xpath) for field, xpath in GBP_XPATHS.items()}
+
+# Knowledge panel fields read as text, and as link/image attributes
+GBP_TEXT_FIELDS = ('gbp_title', 'gbp_address', 'gbp_phone')
+GBP_ATTRIBUTE_FIELDS = {
+    'gbp_website': 'href',
+    'gbp_image': 'src',
+    'gbp_map_image': 'src',
+    'gbp_outside_image': 'src',
+    'gbp_cid_link': 'href'
+}
+
+def _append_text(node, parts):
+    """Recursively collect the visible text of a node into parts"""
+    tag = node.tag.lower() if isinstance(node.tag, str) else None
+    if tag is not None and tag not in _SKIPPED_TAGS:
+        if tag in _BLOCK_TAGS:
+            parts.append('\n')
+        # Source newlines are plain whitespace; only block tags break lines
+        if node.text:
+            parts.append(node.text.replace('\n', ' '))
+        for child in node:
+            _append_text(child, parts)
+            if child.tail:
+                parts.append(child.tail.replace('\n', ' '))
+        if tag in _BLOCK_TAGS:
+            parts.append('\n')
+
+def node_text(node):
+    """Get whitespace-normalized text from an lxml element, matching element.text.strip()"""
+    parts = []
+    _append_text(node, parts)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line).strip()
+
+def first_text(tree, xpath_object):
+    """Text of the first node matched by a compiled XPath, or an empty string"""
+    nodes = xpath_object(tree)
+    if not nodes:
+        return ""
+    node = nodes[0]
+    if isinstance(node, str):
+        return node.strip()
+    return node_text(node)
+
+def first_attribute(tree, xpath_object, attribute, base_url=None):
+    """Attribute of the first node matched by a compiled XPath, or an empty string"""
+    nodes = xpath_object(tree)
+    if not nodes or isinstance(nodes[0], str):
+        return ""
+    value = nodes[0].get(attribute)
+    if not value:
+        return ""
+    # WebDriver resolves href/src against the page URL, so do the same
+    return urljoin(base_url, value) if base_url else value
+
+def parse_html(page_source):
+    """Parse an HTML document into an lxml tree"""
+    return lxml_html.fromstring(page_source)
+
+def parse_extra_fields(tree):
+    """Extract extra fields from a parsed listing page"""
+    extra_fields = {}
+    for element in EXTRA_FIELDS_XPATH_OBJECT(tree):
+        key_elements = EXTRA_FIELD_KEY_XPATH(element)
+        value_elements = EXTRA_FIELD_VALUE_XPATH(element)
+        if not key_elements or not value_elements:
+            continue
+
+        key = node_text(key_elements[0])
+
+        # Skip if it's a standard field
+        if key in STANDARD_FIELDS:
+            continue
+
+        value = node_text(value_elements[0])
+        if key and value:  # Only add if both key and value exist
+            extra_fields[key] = value
+
+    return extra_fields
+
+def parse_listing_html(page_source, url):
+    """Extract all listing details from page HTML in a single local pass"""
+    tree = parse_html(page_source)
+
+    # Initialize data dictionary
+    data = {'url': url}
+
+    # Extract all fields
+    for field, xpath_object in DETAIL_XPATH_OBJECTS.items():
+        if field == 'website':
+            data[field] = first_attribute(tree, xpath_object, 'href', url)
+        else:
+            data[field] = first_text(tree, xpath_object)
+
+    # Format full address
+    address_parts = [
+        data['address_line1'],
+        data['address_line2'],
+        data['locality'],
+        data['administrative_area'],
+        data['postal_code'],
+        data['country']
+    ]
+    data['full_address'] = ' '.join(filter(None, address_parts))
+
+    # Get extra fields
+    data['extra_fields'] = parse_extra_fields(tree)
+
+    return data
+
+def parse_listing_urls(page_source, page_url):
+    """Extract absolute listing URLs from a directory search results page"""
+    tree = parse_html(page_source)
+    urls = []
+    for element in LISTING_URLS_XPATH_OBJECT(tree):
+        href = element.get('href')
+        if href:
+            urls.append(urljoin(page_url, href))
+    return urls
+
+def parse_last_page_url(page_source, page_url):
+    """Get the absolute URL of the pager's last page link, or an empty string"""
+    tree = parse_html(page_source)
+    return first_attribute(tree, LAST_PAGE_XPATH_OBJECT, 'href', page_url)
+
+def parse_gbp_html(page_source, page_url=None, max_reviews=5):
+    """Extract the knowledge panel, and any reviews in the page, from a saved Google results page"""
+    tree = parse_html(page_source)
+    result = {field: first_text(tree, GBP_XPATH_OBJECTS[field]) for field in GBP_TEXT_FIELDS}
+    for field, attribute in GBP_ATTRIBUTE_FIELDS.items():
+        result[field] = first_attribute(tree, GBP_XPATH_OBJECTS[field], attribute, page_url)
+
+    result['reviews'] = [node_text(node) for node in GBP_XPATH_OBJECTS['review_text'](tree)[:max_reviews]]
+    ratings = []
+    for node in GBP_XPATH_OBJECTS['review_rating'](tree)[:max_reviews]:
+        label = (node.get('aria-label') or '').split(' ')
+        if len(label) > 1:
+            ratings.append(label[1])
+    result['ratings'] = ratings
+
+    # Gallery images, present when the page was archived with the photo modal open
+    embedded = [first_attribute(tree, GBP_XPATH_OBJECTS['large_image'], 'src', page_url)]
+    embedded += [
+        urljoin(page_url, node.get('src')) if page_url else node.get('src')
+        for node in GBP_XPATH_OBJECTS['additional_images'](tree)[:2] if node.get('src')
+    ]
+    result['embedded_images'] = [src for src in embedded if src]
+    return result
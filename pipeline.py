@@ -0,0 +1,57 @@
+import queue
+import threading
+from functions import process_gbp_row
+from csv_writer import CsvBatchWriter
+
+# Maximum number of extracted listings waiting for the GBP stage
+DEFAULT_QUEUE_SIZE = 50
+
+# Sentinel put on the queue once the directory phase is finished
+_END_OF_STREAM = object()
+
+def _produce_listings(listings, listing_queue, listing_filename):
+    """Directory stage: save each extracted listing and hand it to the GBP stage"""
+    count = 0
+    writer = CsvBatchWriter(listing_filename)
+    try:
+        for listing_data in listings:
+            writer.writerow(listing_data)
+            # Blocks while the queue is full, so memory stays bounded
+            listing_queue.put(dict(listing_data))
+            count += 1
+    except Exception as e:
+        print(f"An error occurred in the directory phase: {str(e)}")
+    finally:
+        writer.close()
+        print(f"\nDirectory phase finished after {count} listings")
+        listing_queue.put(_END_OF_STREAM)
+
+def run_streaming_pipeline(listings, gbp_supervisor, queue_size=DEFAULT_QUEUE_SIZE,
+                           listing_filename='restoration_listings.csv',
+                           reviews_filename='restoration_listings_with_reviews.csv',
+                           state=None, cache=None, sink=None, **lookup_options):
+    """Run the directory and GBP phases concurrently, connected by a bounded queue"""
+    listing_queue = queue.Queue(maxsize=queue_size)
+
+    # The producer consumes the listings iterator on its own thread
+    producer = threading.Thread(
+        target=_produce_listings,
+        args=(listings, listing_queue, listing_filename),
+        daemon=True
+    )
+    producer.start()
+
+    processed = 0
+    writer = CsvBatchWriter(reviews_filename)
+    while True:
+        row = listing_queue.get()
+        if row is _END_OF_STREAM:
+            break
+
+        if process_gbp_row(gbp_supervisor, row, writer, state, cache, sink, **lookup_options):
+            processed += 1
+
+    writer.close()
+    producer.join()
+    print(f"GBP phase finished after {processed} listings")
+    return processed
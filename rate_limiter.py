@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Per-host pacing: starting rate, bounds (requests/second) and burst size
+HOST_LIMITS = {
+    'pro.restorationindustry.org': {'rate': 1.0, 'min_rate': 0.1, 'max_rate': 8.0, 'burst': 2},
+    'google.com': {'rate': 0.5, 'min_rate': 0.02, 'max_rate': 1.0, 'burst': 1},
+    'googleusercontent.com': {'rate': 10.0, 'min_rate': 0.5, 'max_rate': 40.0, 'burst': 16}
+}
+DEFAULT_LIMITS = {'rate': 2.0, 'min_rate': 0.1, 'max_rate': 10.0, 'burst': 4}
+
+# Healthy responses in a row before the rate is raised, and by how much
+SPEEDUP_AFTER = 10
+SPEEDUP_FACTOR = 1.25
+
+# Exponential backoff on block signals: base * 2^(blocks - 1) seconds, capped, plus jitter
+BACKOFF_BASE = 30
+BACKOFF_MAX = 30 * 60
+BACKOFF_JITTER = 0.25
+
+# Markers of captcha, consent and rate-limit pages
+BLOCK_URL_MARKERS = ('google.com/sorry', 'consent.google.', '/recaptcha/')
+BLOCK_TITLE_MARKERS = ('unusual traffic', 'just a moment', 'access denied', 'attention required', 'too many requests')
+BLOCK_STATUS_CODES = {403, 429, 503}
+
+def host_key(url):
+    """Group a URL under the host it is paced by (all Google search domains share one bucket)"""
+    host = urlsplit(url).netloc.lower().split(':')[0]
+    if host.startswith('www.'):
+        host = host[4:]
+    # Only the search front ends (google.com, google.co.uk, ...); image and map tile hosts such as
+    # maps.google.com keep buckets of their own, so downloads neither crawl at search pace nor use up its tokens
+    if host == 'google.com' or host.startswith('google.'):
+        return 'google.com'
+    # GBP photos come from numbered CDN hosts (lh3, lh5, ...) that share one bucket
+    if host.endswith('.googleusercontent.com'):
+        return 'googleusercontent.com'
+    return host
+
+def is_block_page(url='', title='', status_code=None):
+    """True if a response looks like a captcha, consent wall or rate-limit page"""
+    if status_code in BLOCK_STATUS_CODES:
+        return True
+    url = (url or '').lower()
+    title = (title or '').lower()
+    return any(marker in url for marker in BLOCK_URL_MARKERS) or any(
+        marker in title for marker in BLOCK_TITLE_MARKERS
+    )
+
+class HostBucket:
+    """Token bucket for one host whose rate adapts to response health"""
+
+    def __init__(self, rate, min_rate, max_rate, burst):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.healthy_streak = 0
+        self.blocks = 0
+        self.total_blocks = 0
+        self.requests = 0
+
+    def _refill(self, now):
+        """Add tokens for the time elapsed (not during a backoff, when updated is in the future)"""
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller must wait before using it"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        self.requests += 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return wait + max(0.0, self.updated - now)
+
+    def success(self):
+        """Raise the rate one step after a run of healthy responses"""
+        self.blocks = 0
+        self.healthy_streak += 1
+        if self.healthy_streak >= SPEEDUP_AFTER:
+            self.healthy_streak = 0
+            self.rate = min(self.max_rate, self.rate * SPEEDUP_FACTOR)
+
+    def block(self):
+        """Halve the rate and pause the host with exponential backoff plus jitter"""
+        self.healthy_streak = 0
+        self.blocks += 1
+        self.total_blocks += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.blocks - 1))
+        backoff *= 1 + random.uniform(-BACKOFF_JITTER, BACKOFF_JITTER)
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = now + backoff
+        return backoff
+
+class AdaptiveScheduler:
+    """Paces every fetch per host and adapts the rates to block signals"""
+
+    def __init__(self, host_limits=HOST_LIMITS):
+        self.host_limits = {host: dict(limits) for host, limits in host_limits.items()}
+        self.default_limits = dict(DEFAULT_LIMITS)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        """Get or create the bucket for a host (caller holds the lock)"""
+        if host not in self._buckets:
+            self._buckets[host] = HostBucket(**self.host_limits.get(host, self.default_limits))
+        return self._buckets[host]
+
+    def configure(self, host, **limits):
+        """Override the limits of a host, e.g. its starting rate"""
+        with self._lock:
+            self.host_limits.setdefault(host, dict(self.default_limits)).update(limits)
+            self._buckets.pop(host, None)
+
+    def scale(self, share):
+        """Keep every host's rates to a share of their configured values, e.g. 1/N of N processes crawling together"""
+        with self._lock:
+            for limits in list(self.host_limits.values()) + [self.default_limits]:
+                for key in ('rate', 'min_rate', 'max_rate'):
+                    limits[key] *= share
+            self._buckets = {}
+
+    def reserve(self, url):
+        """Take a slot for this URL's host and return the seconds to wait before using it (for callers that cannot block)"""
+        with self._lock:
+            return self._bucket(host_key(url)).reserve()
+
+    def acquire(self, url):
+        """Block until a request to this URL's host is allowed"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record_success(self, url):
+        """Report a healthy response"""
+        with self._lock:
+            self._bucket(host_key(url)).success()
+
+    def record_block(self, url):
+        """Report a captcha/consent/rate-limit response"""
+        host = host_key(url)
+        with self._lock:
+            backoff = self._bucket(host).block()
+            rate = self._buckets[host].rate
+        print(f"Block signal from {host}: backing off {backoff:.0f}s, rate now {rate:.3f} req/s")
+
+    def get_rates(self):
+        """Current pacing per host"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(bucket.rate, 4),
+                    'requests': bucket.requests,
+                    'blocks': bucket.total_blocks,
+                    'backoff_remaining': round(max(0.0, bucket.updated - now), 1)
+                }
+                for host, bucket in self._buckets.items()
+            }
+
+    def print_rates(self):
+        """Print current pacing per host"""
+        rates = self.get_rates()
+        if not rates:
+            return
+        print("\nRequest rates:")
+        for host, stats in sorted(rates.items()):
+            print(f"  {host}: {stats['rate']} req/s, {stats['requests']} requests, {stats['blocks']} blocks")
+
+# Shared by every fetch path in the process
+SCHEDULER = AdaptiveScheduler()
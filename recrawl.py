@@ -0,0 +1,146 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Default location of the incremental recrawl index
+DEFAULT_RECRAWL_DB = 'recrawl_index.db'
+
+# A listing is revisited after MIN_REVISIT seconds, doubling with every unchanged visit up to MAX_REVISIT
+DEFAULT_MIN_REVISIT = 24 * 3600
+DEFAULT_MAX_REVISIT = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    gbp_row TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    changed_at REAL NOT NULL,
+    unchanged_streak INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+def content_hash(data):
+    """Stable hash of the extracted listing fields, ignoring page chrome that changes on every fetch"""
+    fields = {key: value for key, value in data.items() if not key.startswith(('gbp_', 'review_'))}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class RecrawlIndex:
+    """Persistent content hash, validators and revisit schedule per listing URL, kept across runs"""
+
+    def __init__(self, path=DEFAULT_RECRAWL_DB, min_revisit=DEFAULT_MIN_REVISIT, max_revisit=DEFAULT_MAX_REVISIT):
+        self.path = path
+        self.min_revisit = min_revisit
+        self.max_revisit = max_revisit
+        self.skipped = 0
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self._validators = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _get(self, url, columns):
+        """One row of the given columns for a URL, or None"""
+        with self._lock:
+            return self._conn.execute(f"SELECT {columns} FROM pages WHERE url = ?", (url,)).fetchone()
+
+    def revisit_interval(self, unchanged_streak):
+        """Seconds until a listing that was unchanged this many visits in a row is due again"""
+        return min(self.max_revisit, self.min_revisit * 2 ** min(unchanged_streak, 16))
+
+    def get_stored_listing(self, url):
+        """Stored listing data if it is not yet due for a revisit, otherwise None"""
+        row = self._get(url, "data, fetched_at, unchanged_streak")
+        if row is None or time.time() - row[1] >= self.revisit_interval(row[2]):
+            return None
+        self.skipped += 1
+        return json.loads(row[0])
+
+    def get_data(self, url):
+        """Last extracted listing data, regardless of schedule"""
+        row = self._get(url, "data")
+        return json.loads(row[0]) if row else None
+
+    def get_gbp_row(self, url):
+        """Listing row merged with the GBP data of its last successful lookup, or None"""
+        row = self._get(url, "gbp_row")
+        return json.loads(row[0]) if row and row[0] else None
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers from the last fetch of a URL"""
+        row = self._get(url, "etag, last_modified")
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def remember_validators(self, url, etag, last_modified):
+        """Hold the validators of a fresh response until its listing is recorded"""
+        with self._lock:
+            self._validators[url] = (etag, last_modified)
+
+    def record(self, url, data):
+        """Store a freshly extracted listing; True if it is new or changed since the last visit"""
+        new_hash = content_hash(data)
+        now = time.time()
+        with self._lock, self._conn:
+            etag, last_modified = self._validators.pop(url, (None, None))
+            row = self._conn.execute(
+                "SELECT content_hash, unchanged_streak, etag, last_modified FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.new += 1
+                self._conn.execute(
+                    "INSERT INTO pages (url, content_hash, data, etag, last_modified, fetched_at, changed_at, "
+                    "unchanged_streak) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (url, new_hash, json.dumps(data), etag, last_modified, now, now)
+                )
+                return True
+
+            # A 304 answer brings no validators, so keep the stored ones
+            etag = etag or row[2]
+            last_modified = last_modified or row[3]
+            if row[0] == new_hash:
+                self.unchanged += 1
+                self._conn.execute(
+                    "UPDATE pages SET etag = ?, last_modified = ?, fetched_at = ?, "
+                    "unchanged_streak = unchanged_streak + 1 WHERE url = ?",
+                    (etag, last_modified, now, url)
+                )
+                return False
+
+            self.changed += 1
+            self._conn.execute(
+                "UPDATE pages SET content_hash = ?, data = ?, gbp_row = NULL, etag = ?, last_modified = ?, "
+                "fetched_at = ?, changed_at = ?, unchanged_streak = 0 WHERE url = ?",
+                (new_hash, json.dumps(data), etag, last_modified, now, now, url)
+            )
+            return True
+
+    def save_gbp_rows(self, rows):
+        """Keep the GBP results of this run for listings that turn out unchanged next time"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE pages SET gbp_row = ? WHERE url = ?", [(json.dumps(row), url) for url, row in rows]
+            )
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def print_stats(self):
+        """Print how much of the crawl the schedule and change detection saved"""
+        print(f"\nIncremental recrawl ({self.path}): {self.skipped} listings not due, "
+              f"{self.unchanged} unchanged, {self.changed} changed, {self.new} new")
@@ -0,0 +1,74 @@
+from selenium.webdriver.common.by import By
+from xpaths import GBP_XPATHS
+from waits import wait_for_element, wait_for_absence
+from metrics import METRICS, STAGE_REVIEW_EXPANSION
+
+# Columns of the normalized reviews file, one row per review
+REVIEW_FIELDNAMES = ['listing_url', 'review_index', 'rating', 'text']
+
+# Default file reviews are streamed to
+DEFAULT_REVIEWS_FILE = 'restoration_reviews.csv'
+
+# Stop after this many reviews per business
+DEFAULT_MAX_REVIEWS = 500
+
+# Seconds to wait for another batch of reviews after scrolling
+SCROLL_TIMEOUT = 5
+
+# Seconds to wait for "More" links in a batch to expand
+EXPAND_TIMEOUT = 2
+
+def _after(xpath, count):
+    """XPath selecting only the matches after the first count, so old ones are not re-fetched"""
+    return f"({xpath})[position() > {count}]"
+
+def _parse_rating(element):
+    """Rating value from an aria-label like 'Rated 4.0 out of 5'"""
+    try:
+        return element.get_attribute('aria-label').split(' ')[1]
+    except Exception:
+        return ""
+
+def harvest_reviews(driver, on_review, max_reviews=DEFAULT_MAX_REVIEWS):
+    """Scroll-load the open reviews pane in batches, calling on_review(index, text, rating) per new review"""
+    loaded = 0
+    harvested = 0
+
+    while harvested < max_reviews:
+        # Only reviews past those already read, so each is read once and identical reviews are all kept
+        batch_xpath = _after(GBP_XPATHS['review_text'], loaded)
+        review_elements = driver.find_elements(By.XPATH, batch_xpath)
+        if not review_elements:
+            break
+
+        # Expand every "More" link in the batch with one call, then wait for them to go
+        more_xpath = batch_xpath + GBP_XPATHS['review_more_link'].lstrip('.')
+        with METRICS.stage(STAGE_REVIEW_EXPANSION):
+            driver.execute_script(
+                "var links = document.evaluate(arguments[0], document, null, 7, null);"
+                "for (var i = 0; i < links.snapshotLength; i++) { links.snapshotItem(i).click(); }",
+                more_xpath
+            )
+            wait_for_absence(driver, more_xpath, EXPAND_TIMEOUT, label='review_expand')
+
+        rating_elements = driver.find_elements(By.XPATH, _after(GBP_XPATHS['review_rating'], loaded))
+
+        for position, element in enumerate(review_elements):
+            text = element.text.strip()
+            rating = _parse_rating(rating_elements[position]) if position < len(rating_elements) else ""
+
+            harvested += 1
+            on_review(harvested, text, rating)
+            if harvested >= max_reviews:
+                break
+
+        loaded += len(review_elements)
+
+        # Scroll the last review into view so the pane loads the next batch
+        driver.execute_script("arguments[0].scrollIntoView();", review_elements[-1])
+        next_review = f"({GBP_XPATHS['review_text']})[{loaded + 1}]"
+        if wait_for_element(driver, next_review, SCROLL_TIMEOUT, label='reviews_scroll') is None:
+            break
+
+    print(f"Harvested {harvested} reviews")
+    return harvested
@@ -1,18 +1,21 @@
-import pandas as pd
+import csv
 
-# Load the CSV file
-df = pd.read_csv('restoration_listings_with_reviews.csv')
+# Stream the file row by row instead of loading it whole; with --output-format parquet
+# the crawl already keeps the image URLs in their own 'images' column
+with open('restoration_listings_with_reviews.csv', newline='', encoding='utf-8') as infile, \
+     open('gbp_image.csv', 'w', newline='', encoding='utf-8') as image_file, \
+     open('other_columns.csv', 'w', newline='', encoding='utf-8') as other_file:
+    reader = csv.DictReader(infile)
 
-# Separate the 'gbp_image' column
-gbp_image_df = df[['gbp_image']]
+    # Separate the 'gbp_image' column from the rest of the columns
+    other_fieldnames = [column for column in reader.fieldnames if column != 'gbp_image']
+    image_writer = csv.DictWriter(image_file, fieldnames=['gbp_image'], extrasaction='ignore')
+    other_writer = csv.DictWriter(other_file, fieldnames=other_fieldnames, extrasaction='ignore')
+    image_writer.writeheader()
+    other_writer.writeheader()
 
-# Separate the rest of the columns
-other_columns_df = df.drop(columns=['gbp_image'])
+    for row in reader:
+        image_writer.writerow(row)
+        other_writer.writerow(row)
 
-# Save the 'gbp_image' column to a new CSV file
-gbp_image_df.to_csv('gbp_image.csv', index=False)
-
-# Save the other columns to another new CSV file
-other_columns_df.to_csv('other_columns.csv', index=False)
-
-print("Columns have been separated and saved to 'gbp_image.csv' and 'other_columns.csv'.") 
\ No newline at end of file
+print("Columns have been separated and saved to 'gbp_image.csv' and 'other_columns.csv'.")
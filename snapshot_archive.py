@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+import zstandard
+
+# Default folder of the snapshot archive
+DEFAULT_ARCHIVE_DIR = 'snapshots'
+
+# zstd level; pages are written once and re-read rarely, so favour ratio over speed
+COMPRESSION_LEVEL = 10
+
+# Kinds of archived pages
+KIND_RESULTS = 'results'
+KIND_LISTING = 'listing'
+KIND_GBP = 'gbp_serp'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    url TEXT,
+    query TEXT,
+    fetched_at REAL NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_kind_key ON snapshots (kind, key, fetched_at);
+"""
+
+class SnapshotArchive:
+    """Append-only file of zstd-compressed HTML snapshots, indexed by kind, key and fetch time"""
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, level=COMPRESSION_LEVEL):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        data_path = os.path.join(root, 'snapshots.zst')
+        self.added = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._lock = threading.Lock()
+        # Every snapshot is its own zstd frame, so any one can be read back on its own
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._data = open(data_path, 'ab')
+        self._reader = open(data_path, 'rb')
+        self._conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def add(self, kind, key, html, url=None, query=None):
+        """Append one page snapshot"""
+        raw = html.encode('utf-8')
+        with self._lock:
+            frame = self._compressor.compress(raw)
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            self._data.write(frame)
+            self._data.flush()
+            # The frame is on disk before it is indexed, so the index never points past the data
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO snapshots (kind, key, url, query, fetched_at, offset, length, raw_size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, key, url, query, time.time(), offset, len(frame), len(raw))
+                )
+            self.added += 1
+            self.raw_bytes += len(raw)
+            self.compressed_bytes += len(frame)
+
+    def _read_frame(self, offset, length):
+        """Decompress the snapshot stored at offset (caller holds the lock)"""
+        self._reader.seek(offset)
+        return self._decompressor.decompress(self._reader.read(length)).decode('utf-8')
+
+    def get_latest(self, kind, key):
+        """HTML of the newest snapshot of a page, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset, length FROM snapshots WHERE kind = ? AND key = ? "
+                "ORDER BY fetched_at DESC, id DESC LIMIT 1", (kind, key)
+            ).fetchone()
+            return self._read_frame(*row) if row else None
+
+    def iter_latest(self, kind):
+        """Yield (key, url, query, fetched_at, html) for the newest snapshot of each page, in first-seen order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.key, s.url, s.query, s.fetched_at, s.offset, s.length FROM snapshots s "
+                "JOIN (SELECT key, MIN(id) AS first_id, MAX(id) AS last_id FROM snapshots "
+                "WHERE kind = ? GROUP BY key) latest ON s.id = latest.last_id "
+                "ORDER BY latest.first_id", (kind,)
+            ).fetchall()
+        for key, url, query, fetched_at, offset, length in rows:
+            with self._lock:
+                html = self._read_frame(offset, length)
+            yield key, url, query, fetched_at, html
+
+    def count(self, kind=None):
+        """Number of snapshots, optionally of one kind"""
+        with self._lock:
+            if kind is None:
+                return self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM snapshots WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def close(self):
+        """Close the data file and the index"""
+        with self._lock:
+            self._data.close()
+            self._reader.close()
+            self._conn.close()
+
+    def print_stats(self):
+        """Print how much was archived in this run"""
+        ratio = self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0
+        print(f"\nSnapshot archive ({self.root}): {self.added} pages archived, "
+              f"{self.raw_bytes / 1e6:.1f} MB -> {self.compressed_bytes / 1e6:.1f} MB ({ratio:.1f}x)")
+
+# Archive every fetch path records into, when one is set
+_active_archive = None
+
+def set_active_archive(archive):
+    """Make fetched pages be recorded into this archive (None stops recording)"""
+    global _active_archive
+    _active_archive = archive
+
+def is_archiving():
+    """True if pages are being recorded, so callers can skip fetching page_source otherwise"""
+    return _active_archive is not None
+
+def archive_page(kind, key, html, url=None, query=None):
+    """Record a fetched page into the active archive, if any"""
+    archive = _active_archive
+    if archive is None or not html:
+        return
+    try:
+        archive.add(kind, key, html, url, query)
+    except Exception as e:
+        print(f"Error archiving {url or key}: {str(e)}")
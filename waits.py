@@ -0,0 +1,105 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import time
+from metrics import METRICS, FAMILY_WAIT, OUTCOME_HIT, OUTCOME_TIMEOUT
+
+# Hard upper bound for any readiness wait, in seconds
+DEFAULT_TIMEOUT = 10
+
+# How often conditions are re-checked while waiting
+POLL_FREQUENCY = 0.1
+
+def _record_wait(label, started, timed_out):
+    """Record how long a wait actually took in the wait histograms of METRICS"""
+    elapsed = time.monotonic() - started
+    METRICS.observe(FAMILY_WAIT, label, elapsed, OUTCOME_TIMEOUT if timed_out else OUTCOME_HIT)
+    return elapsed
+
+def _wait_until(driver, condition, timeout, label):
+    """Run a WebDriverWait on a condition, returning its result or None on timeout"""
+    started = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+        _record_wait(label, started, False)
+        return result
+    except TimeoutException:
+        _record_wait(label, started, True)
+        return None
+
+def _document_is_ready(driver):
+    """True once the document has finished loading"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+def wait_for_document_ready(driver, timeout=DEFAULT_TIMEOUT, label='document_ready'):
+    """Wait until document.readyState is complete"""
+    return _wait_until(driver, _document_is_ready, timeout, label) is not None
+
+def wait_for_element(driver, xpath, timeout=DEFAULT_TIMEOUT, label='element'):
+    """Wait until an element matching the XPath is present and return it (or None)"""
+    return _wait_until(driver, EC.presence_of_element_located((By.XPATH, xpath)), timeout, label)
+
+def wait_for_staleness(driver, element, timeout=DEFAULT_TIMEOUT, label='staleness'):
+    """Wait until an element is detached from the DOM, e.g. after a pager change"""
+    return _wait_until(driver, EC.staleness_of(element), timeout, label) is not None
+
+def wait_for_page_change(driver, old_element, timeout=DEFAULT_TIMEOUT, label='page_change'):
+    """Wait for the old page element to go stale and the new page to finish loading"""
+    started = time.monotonic()
+    if not wait_for_staleness(driver, old_element, timeout, label=f'{label}_stale'):
+        _record_wait(label, started, True)
+        return False
+    remaining = max(0.0, timeout - (time.monotonic() - started))
+    ready = wait_for_document_ready(driver, remaining, label=f'{label}_ready')
+    _record_wait(label, started, not ready)
+    return ready
+
+def wait_for_absence(driver, xpath, timeout=DEFAULT_TIMEOUT, label='absence'):
+    """Wait until no element matches the XPath, e.g. after expanding collapsed text"""
+    condition = lambda driver: not driver.find_elements(By.XPATH, xpath)
+    return _wait_until(driver, condition, timeout, label) is not None
+
+def _image_src_resolved(xpath):
+    """Condition returning the image element once its src is a real, loaded URL"""
+    def condition(driver):
+        images = driver.find_elements(By.XPATH, xpath)
+        if not images:
+            return False
+        image = images[0]
+        src = image.get_attribute('src') or ''
+        if not src.startswith('http'):
+            return False
+        if not driver.execute_script("return arguments[0].complete", image):
+            return False
+        return image
+    return condition
+
+def wait_for_image_src(driver, xpath, timeout=DEFAULT_TIMEOUT, label='image_src'):
+    """Wait until the image matching the XPath has a resolved http(s) src"""
+    return _wait_until(driver, _image_src_resolved(xpath), timeout, label)
+
+def get_wait_report():
+    """Summarize observed wait durations per label, from the wait histograms of METRICS"""
+    return {
+        label: {
+            'count': stats['count'],
+            'timeouts': stats['outcomes'].get(OUTCOME_TIMEOUT, 0),
+            'total_seconds': stats['total_seconds'],
+            'mean_seconds': stats['mean_seconds'],
+            'max_seconds': stats['max_seconds']
+        }
+        for label, stats in METRICS.summary()[FAMILY_WAIT].items()
+    }
+
+def print_wait_report():
+    """Print how long each kind of readiness wait actually took"""
+    report = get_wait_report()
+    if not report:
+        return
+    print("\nReadiness wait timings:")
+    for label, stats in sorted(report.items()):
+        print(
+            f"  {label}: {stats['count']} waits, {stats['timeouts']} timeouts, "
+            f"mean {stats['mean_seconds']}s, max {stats['max_seconds']}s, total {stats['total_seconds']}s"
+        )
@@ -0,0 +1,193 @@
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import namedtuple
+
+# Default location of the shared task database
+DEFAULT_QUEUE_DB = 'work_queue.db'
+
+# Seconds a claimed task stays owned by one worker before others may take it over
+DEFAULT_LEASE = 600
+
+# Attempts before a task is parked as failed
+MAX_ATTEMPTS = 3
+
+# Task statuses
+STATUS_PENDING = 'pending'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+Task = namedtuple('Task', ['id', 'kind', 'key', 'payload', 'attempts'])
+
+class WorkQueue(ABC):
+    """Shared queue of crawl tasks with leases; backends implement these methods"""
+
+    @abstractmethod
+    def put(self, kind, key, payload=''):
+        """Add a task, ignoring it if a task of this kind and key already exists"""
+
+    def put_many(self, kind, items):
+        """Add (key, payload) tasks of one kind"""
+        for key, payload in items:
+            self.put(kind, key, payload)
+
+    @abstractmethod
+    def claim(self, worker_id, kinds, lease=DEFAULT_LEASE):
+        """Lease the oldest pending (or lease-expired) task of the given kinds, or return None
+
+        Every claim, including taking over an expired lease, counts as an attempt; a task whose lease
+        expires on its last attempt is parked as failed instead of being handed out again.
+        """
+
+    @abstractmethod
+    def complete(self, task_id):
+        """Mark a leased task as done"""
+
+    @abstractmethod
+    def fail(self, task_id, error):
+        """Release a task for another attempt, or park it as failed after MAX_ATTEMPTS"""
+
+    @abstractmethod
+    def has_open_tasks(self, kinds):
+        """True while tasks of these kinds are pending or leased"""
+
+    @abstractmethod
+    def counts(self):
+        """{(kind, status): count}"""
+
+    def close(self):
+        pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (kind, status, id);
+"""
+
+class SqliteWorkQueue(WorkQueue):
+    """WorkQueue in one SQLite file, shared by worker processes on the same machine"""
+
+    def __init__(self, path=DEFAULT_QUEUE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode, so claims can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def put(self, kind, key, payload=''):
+        self._write(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, key, payload, STATUS_PENDING, time.time())
+        )
+
+    def put_many(self, kind, items):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (kind, key, payload, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(kind, key, payload, STATUS_PENDING, now) for key, payload in items]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker_id, kinds, lease=DEFAULT_LEASE):
+        now = time.time()
+        placeholders = ','.join('?' for _ in kinds)
+        with self._lock:
+            # Take the write lock first, so two workers never claim the same task
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A lease that expired on its last attempt most likely killed its worker: park it
+                self._conn.execute(
+                    f"UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+                    f"error = 'lease expired on the last attempt', updated_at = ? "
+                    f"WHERE kind IN ({placeholders}) AND status = ? AND lease_expires < ? AND attempts >= ?",
+                    (STATUS_FAILED, now, *kinds, STATUS_LEASED, now, MAX_ATTEMPTS)
+                )
+                row = self._conn.execute(
+                    f"SELECT id, kind, key, payload, attempts FROM tasks WHERE kind IN ({placeholders}) "
+                    f"AND (status = ? OR (status = ? AND lease_expires < ?)) ORDER BY id LIMIT 1",
+                    (*kinds, STATUS_PENDING, STATUS_LEASED, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    (STATUS_LEASED, worker_id, now + lease, now, row[0])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Task(row[0], row[1], row[2], row[3], row[4] + 1)
+
+    def complete(self, task_id):
+        self._write(
+            "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?",
+            (STATUS_DONE, time.time(), task_id)
+        )
+
+    def fail(self, task_id, error):
+        self._write(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_owner = NULL, "
+            "lease_expires = NULL, error = ?, updated_at = ? WHERE id = ?",
+            (MAX_ATTEMPTS, STATUS_FAILED, STATUS_PENDING, str(error)[:500], time.time(), task_id)
+        )
+
+    def has_open_tasks(self, kinds):
+        placeholders = ','.join('?' for _ in kinds)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM tasks WHERE kind IN ({placeholders}) AND status IN (?, ?) LIMIT 1",
+                (*kinds, STATUS_PENDING, STATUS_LEASED)
+            ).fetchone()
+        return row is not None
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status").fetchall()
+        return {(kind, status): count for kind, status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Queue backends selectable by URL scheme, e.g. sqlite:///work_queue.db
+QUEUE_BACKENDS = {
+    'sqlite': SqliteWorkQueue
+}
+
+def open_queue(url):
+    """Open a work queue from a backend URL (sqlite:///relative.db, sqlite:////abs/path.db or a bare path)"""
+    scheme, separator, location = url.partition('://')
+    if not separator:
+        return SqliteWorkQueue(url)
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown work queue backend: {scheme}")
+    # Like SQLAlchemy URLs, the third slash separates the (empty) host from the path
+    return QUEUE_BACKENDS[scheme](location[1:] if location.startswith('/') else location)
@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+from driver_setup import setup_driver
+from driver_supervisor import DriverSupervisor
+from functions import extract_listing_details
+
+# Default number of browser workers (one per core on the crawl box)
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+class _Batch:
+    """Listing URLs handed to the pool by one extract() call, answered on its own queue"""
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+
+class BrowserPool:
+    """Browser workers kept alive across start URLs, each pulling listing URLs from one shared task queue"""
+
+    def __init__(self, num_workers=DEFAULT_WORKERS, driver_factory=setup_driver, extract_fn=extract_listing_details,
+                 supervisor_options=None):
+        self.num_workers = max(1, num_workers)
+        self.driver_factory = driver_factory
+        self.extract_fn = extract_fn
+        self.supervisor_options = supervisor_options or {}
+        self._tasks = queue.Queue()
+        self._workers = []
+        self._live_workers = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Launch the workers on first use, so no browser sits idle while the first result pages are walked"""
+        if self._workers:
+            return
+        self._live_workers = self.num_workers
+        self._workers = [
+            threading.Thread(target=self._worker, args=(worker_id,), daemon=True)
+            for worker_id in range(1, self.num_workers + 1)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _worker(self, worker_id):
+        """Extract queued listings on a dedicated, supervised driver until the pool closes"""
+        try:
+            supervisor = DriverSupervisor(
+                self.driver_factory, name=f'worker {worker_id} browser', **self.supervisor_options
+            )
+        except Exception as e:
+            print(f"[worker {worker_id}] Failed to start browser: {str(e)}")
+            with self._lock:
+                self._live_workers -= 1
+                last_worker = self._live_workers == 0
+            # The last worker to fail answers the remaining tasks, so extract() never waits forever
+            if last_worker:
+                self._fail_tasks()
+            return
+
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                batch, index, url = task
+                if batch.cancelled.is_set():
+                    continue
+
+                print(f"[worker {worker_id}] Processing listing {index + 1}: {url}")
+
+                # Isolate failures so one bad page does not take down the worker
+                try:
+                    data = supervisor.run(self.extract_fn, url)
+                except Exception as e:
+                    print(f"[worker {worker_id}] Error extracting {url}: {str(e)}")
+                    data = None
+
+                if data:
+                    print(f"[worker {worker_id}] Successfully collected data for {url}")
+                else:
+                    print(f"[worker {worker_id}] Failed to extract data for {url}")
+                batch.results.put((index, data))
+        finally:
+            supervisor.quit()
+            supervisor.print_stats()
+
+    def _fail_tasks(self):
+        """Answer every task with no data once no worker browser is left"""
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            batch, index, url = task
+            print(f"No worker browser available, listing not processed: {url}")
+            batch.results.put((index, None))
+
+    def extract(self, urls):
+        """Yield the details of each URL (None on failure) in input order, as soon as each one is ready"""
+        urls = list(urls)
+        if not urls:
+            return
+        self._start()
+
+        batch = _Batch()
+        for index, url in enumerate(urls):
+            self._tasks.put((batch, index, url))
+
+        # Listings finish out of order; hold early ones back until their predecessors are in
+        finished = {}
+        try:
+            for index in range(len(urls)):
+                while index not in finished:
+                    done_index, data = batch.results.get()
+                    finished[done_index] = data
+                yield finished.pop(index)
+        finally:
+            # A consumer that stops early leaves its remaining URLs to be skipped
+            batch.cancelled.set()
+
+    def close(self):
+        """Stop the workers and quit their browsers"""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
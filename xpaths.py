@@ -1,10 +1,14 @@
 # XPath selectors for the restoration industry website
 LISTING_URLS = "//span[@class='field-content']/a"
 NEXT_PAGE_BUTTON = "//a[@title='Go to next page']"
+LAST_PAGE_BUTTON = "//a[@title='Go to last page']"
 
 # Base URL for the website
 BASE_URL = "https://pro.restorationindustry.org"
 
+# Google home page the business searches start from
+GOOGLE_URL = "https://www.google.com"
+
 # Detailed information XPaths
 DETAIL_XPATHS = {
     'title': "//h1[@class='page-header']",
@@ -25,8 +29,11 @@ DETAIL_XPATHS = {
 
 # Google Business Profile XPaths
 GBP_XPATHS = {
+    'search_results': "//div[@id='search'] | //div[@id='rhs']",
     'reviews_button': "//span[text()='Reviews']",
     'review_text': "//div[@class='OA1nbd']",
+    'review_more_link': ".//a[text()='More']",
+    'review_rating': "//div[contains(@aria-label, 'Rated')]",
     'gbp_title': "//div[@id='rhs']//div[@data-attrid='title'] | //h2[@data-attrid='title']",
     'gbp_address': "//div[@id='rhs']//span[@class='LrzXr']",
     'gbp_phone': "//div[@id='rhs']//span[contains(@aria-label, 'Call phone number')]",
@@ -36,7 +43,8 @@ GBP_XPATHS = {
     'gbp_outside_image': "//div[@class='nmrhhd luib-5']//div[.//span[text()='See outside']]//img",
     'gbp_cid_link': "//div/span/a[contains(@href,'cid=')]",
     'embedded_images': "//div[@aria-label='Photo gallery']//img[not(contains(@src, 'https://streetviewpixels'))]",
-    'large_image': "//img[contains(@jsaction,'load:trigger')]"
+    'large_image': "//img[contains(@jsaction,'load:trigger')]",
+    'additional_images': "//img[@data-ils=3 and @jsaction='rcuQ6b:trigger.M8vzZb']"
 }
 
 # XPath for extra fields